@@ -1,94 +1,226 @@
+import argparse
 import time
-from pymongo import MongoClient
 from datetime import datetime, timedelta
+from controllers.Shared.database import get_db, run_atomic
 
 # Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["QueueSystem"]
+db = get_db()
 
 # Collections
 queue_records = db["CashierQueueRecords"]
 queue_stats = db["CashierQueueStats"]
+stats_ledger = db["CashierQueueStatsLedger"]  # record _id -> what it last added to the stats
+watermarks = db["AggregatorWatermarks"]
+
+CONFIG = {
+    "interval": 20,  # Seconds between passes
+    "batch_size": 1000,  # Changed records folded in per transaction
+    "overlap": timedelta(seconds=30),  # Re-read window for writes that committed behind the watermark
+    # Days of ledger kept; older records are assumed final. A change to one after that is counted again
+    # until its day is rebuilt with --rebuild.
+    "ledger_days": 7
+}
+
+_seeded_days = set()
+
+COUNT_FIELDS = ["total_transactions", "completed", "cut_off_cancelled", "priority_count", "regular_count",
+                "student_count", "guest_count"]
+
+
+def _key(value):
+    # Field names inside by_section / by_cashier / hourly_distribution cannot contain dots or start with $
+    return str(value).replace(".", "_").lstrip("$")
+
+
+def contribution(record):
+    """
+    What one queue record adds to its day's stats document, as {field path: count}, plus its
+    processing_times entry. Mirrors the old full-day $group pipeline.
+    """
+    transaction = record.get("transaction") or ""
+    counts = {
+        "total_transactions": 1,
+        "completed": int(transaction == "Completed"),
+        "cut_off_cancelled": int(transaction.lower() == "cut off/cancelled"),
+        "priority_count": int(record.get("priority") is True),
+        "regular_count": int(record.get("priority") is False),
+        "student_count": int(record.get("role") == "Student"),
+        "guest_count": int(record.get("role") == "Guest")
+    }
+    if record.get("section") is not None:
+        counts[f"by_section.{_key(record['section'])}"] = 1
+    if record.get("reserved_by") is not None:
+        counts[f"by_cashier.{_key(record['reserved_by'])}"] = 1
+    hour = (record.get("date") or "")[11:13]
+    if hour:
+        counts[f"hourly_distribution.{hour}"] = 1
+
+    processing = {
+        "record_id": record["_id"],
+        "reserved_by": record.get("reserved_by"),
+        "start_time": record.get("date"),
+        "end_time": record.get("completed_at")
+    }
+    return {"counts": counts, "processing": processing}
+
+
+def empty_stats():
+    return {field: 0 for field in COUNT_FIELDS} | {
+        "by_section": {}, "by_cashier": {}, "hourly_distribution": {}, "processing_times": []
+    }
+
+
+def fold_records(records):
+    """
+    Folds changed records into the stats with $inc: each record's new contribution minus the one
+    recorded in the ledger, so re-reading a record that did not change adds nothing.
+    """
+    ledger = {entry["_id"]: entry for entry in stats_ledger.find({"_id": {"$in": [r["_id"] for r in records]}})}
+    deltas = {}  # date -> {"inc": {}, "pull": [record ids], "push": [entries]}
+    ledger_writes = []
+
+    for record in records:
+        day = (record.get("date") or "")[:10]
+        if not day:
+            continue
+        new = contribution(record)
+        old = ledger.get(record["_id"])
+        if old and old["date"] == day and old["counts"] == new["counts"] and old["processing"] == new["processing"]:
+            continue
+
+        if old:
+            old_delta = deltas.setdefault(old["date"], {"inc": {}, "pull": [], "push": []})
+            for field, count in old["counts"].items():
+                old_delta["inc"][field] = old_delta["inc"].get(field, 0) - count
+            old_delta["pull"].append(record["_id"])
+        delta = deltas.setdefault(day, {"inc": {}, "pull": [], "push": []})
+        for field, count in new["counts"].items():
+            delta["inc"][field] = delta["inc"].get(field, 0) + count
+        delta["push"].append(new["processing"])
+        ledger_writes.append((record["_id"], {"date": day, **new}))
+
+    def _apply(session=None):
+        for day, delta in deltas.items():
+            # Seeded separately: $setOnInsert of a field would conflict with an $inc of the same path
+            queue_stats.update_one({"_id": {"date": day}}, {"$setOnInsert": empty_stats()}, upsert=True,
+                                   session=session)
+            update = {}
+            inc = {field: count for field, count in delta["inc"].items() if count}
+            if inc:
+                update["$inc"] = inc
+            if delta["pull"]:
+                update["$pull"] = {"processing_times": {"record_id": {"$in": delta["pull"]}}}
+            if update:
+                queue_stats.update_one({"_id": {"date": day}}, update, session=session)
+            # The old $group pipeline never produced a zero entry in by_section / by_cashier / hourly_distribution
+            for field in (field for field, count in inc.items() if count < 0 and "." in field):
+                queue_stats.update_one({"_id": {"date": day}, field: 0}, {"$unset": {field: ""}}, session=session)
+            # $pull and $push on the same array cannot share one update
+            if delta["push"]:
+                queue_stats.update_one({"_id": {"date": day}},
+                                       {"$push": {"processing_times": {"$each": delta["push"]}}}, session=session)
+        for record_id, entry in ledger_writes:
+            stats_ledger.replace_one({"_id": record_id}, entry, upsert=True, session=session)
+
+    if ledger_writes:
+        # Stats and ledger move together, or a retry would count the same change twice
+        run_atomic(_apply, db.client)
+    return len(ledger_writes)
+
+
+def load_watermark():
+    doc = watermarks.find_one({"_id": queue_records.name})
+    return doc["updated_at"] if doc else None
+
+
+def save_watermark(updated_at):
+    watermarks.update_one({"_id": queue_records.name}, {"$max": {"updated_at": updated_at}}, upsert=True)
+
+
+def prune_ledger(today):
+    """ Drops ledger entries for days past the retention window (indexed on date). """
+    oldest = (datetime.strptime(today, "%Y-%m-%d") - timedelta(days=CONFIG["ledger_days"])).strftime("%Y-%m-%d")
+    return stats_ledger.delete_many({"date": {"$lt": oldest}}).deleted_count
+
+
+def rebuild(day):
+    """ Full rebuild of one day: reset its stats, drop its ledger entries, then fold every record of the day. """
+    # An upsert rather than delete + insert, which a running pass's $setOnInsert seed could race into a duplicate key
+    queue_stats.update_one({"_id": {"date": day}}, {"$set": empty_stats()}, upsert=True)
+    stats_ledger.delete_many({"date": day})
+
+    started = datetime.utcnow()
+    folded = 0
+    last_id = None
+    while True:
+        query = {"day": day}  # Indexed, unlike the date string
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(queue_records.find(query).sort("_id", 1).limit(CONFIG["batch_size"]))
+        if not batch:
+            break
+        folded += fold_records(batch)
+        last_id = batch[-1]["_id"]
+    # Anything written during the rebuild is picked up by the next incremental pass
+    save_watermark(started - CONFIG["overlap"])
+    return folded
 
-# Aggregation Pipeline
-def get_daily_stats_pipeline(start_date_str, end_date_str):
-    return [
-        {"$match": {"date": {"$gte": start_date_str, "$lte": end_date_str}}},
-        {"$group": {
-            "_id": {"date": {"$substr": ["$date", 0, 10]}},
-            "total_transactions": {"$sum": 1},
-            "completed": {"$sum": {"$cond": [{"$eq": ["$transaction", "Completed"]}, 1, 0]}},
-            "cut_off_cancelled": {"$sum": {"$cond": [{"$regexMatch": {"input": "$transaction", "regex": "^Cut Off/Cancelled$", "options": "i"}}, 1, 0]}},
-            "priority_count": {"$sum": {"$cond": [{"$eq": ["$priority", True]}, 1, 0]}},
-            "regular_count": {"$sum": {"$cond": [{"$eq": ["$priority", False]}, 1, 0]}},
-            "student_count": {"$sum": {"$cond": [{"$eq": ["$role", "Student"]}, 1, 0]}},
-            "guest_count": {"$sum": {"$cond": [{"$eq": ["$role", "Guest"]}, 1, 0]}},
-            "by_section": {"$push": "$section"},
-            "by_cashier": {"$push": "$reserved_by"},
-            "hourly_distribution": {"$push": {"hour": {"$substr": ["$date", 11, 2]}, "count": 1}},
-            "processing_times": {"$push": {"reserved_by": "$reserved_by", "start_time": "$date", "end_time": "$completed_at"}}
-        }},
-        {"$project": {
-            "_id": 1,
-            "total_transactions": 1,
-            "completed": 1,
-            "cut_off_cancelled": 1,
-            "priority_count": 1,
-            "regular_count": 1,
-            "student_count": 1,
-            "guest_count": 1,
-            "by_section": {"$arrayToObject": {"$map": {"input": {"$setUnion": ["$by_section"]}, "as": "section", "in": {"k": "$$section", "v": {"$size": {"$filter": {"input": "$by_section", "as": "s", "cond": {"$eq": ["$$s", "$$section"]}}}}}}}},
-            "by_cashier": {"$arrayToObject": {"$map": {"input": {"$setUnion": ["$by_cashier"]}, "as": "cashier", "in": {"k": "$$cashier", "v": {"$size": {"$filter": {"input": "$by_cashier", "as": "c", "cond": {"$eq": ["$$c", "$$cashier"]}}}}}}}},
-            "hourly_distribution": {"$arrayToObject": {"$map": {"input": {"$setUnion": ["$hourly_distribution"]}, "as": "hour_data", "in": {"k": "$$hour_data.hour", "v": {"$size": {"$filter": {"input": "$hourly_distribution", "as": "h", "cond": {"$eq": ["$$h.hour", "$$hour_data.hour"]}}}}}}}},
-            "processing_times": 1
-        }}
-    ]
 
 # Function to run aggregation and update stats
 def run_aggregation():
+    """ Folds in only the records changed since the watermark; the first run rebuilds today. """
     today = datetime.now().strftime("%Y-%m-%d")
-    start_date_str = f"{today} 00:00:00"
-    end_date_str = f"{today} 23:59:59"
-
-    # Check if today's stats already exist
-    existing_stats = queue_stats.find_one({"_id.date": today})
-
-    pipeline = get_daily_stats_pipeline(start_date_str, end_date_str)
-    result = list(queue_records.aggregate(pipeline))
-
-    if result:
-        for doc in result:
-            query = {"_id.date": doc["_id"]["date"]}
-            # Exclude _id from the update to avoid immutable field error
-            update_doc = {k: v for k, v in doc.items() if k != "_id"}
-            queue_stats.update_one(query, {"$set": update_doc}, upsert=True)
-        print(f"✅ Updated stats for {today}.")
-    elif not existing_stats:
-        # Create an empty stats document if none exists
-        empty_doc = {
-            "_id": {"date": today},
-            "total_transactions": 0,
-            "completed": 0,
-            "cut_off_cancelled": 0,
-            "priority_count": 0,
-            "regular_count": 0,
-            "student_count": 0,
-            "guest_count": 0,
-            "by_section": {},
-            "by_cashier": {},
-            "hourly_distribution": {},
-            "processing_times": []
-        }
-        queue_stats.insert_one(empty_doc)
-        print(f"🆕 Created empty stats for {today}.")
+
+    watermark = load_watermark()
+    if watermark is None:
+        folded = rebuild(today)
+        print(f"🆕 No watermark yet: rebuilt stats for {today} from {folded} records.")
+        return
+
+    # Today's document exists even before its first ticket; the day's first pass also prunes the ledger
+    if today not in _seeded_days:
+        queue_stats.update_one({"_id": {"date": today}}, {"$setOnInsert": empty_stats()}, upsert=True)
+        pruned = prune_ledger(today)
+        if pruned:
+            print(f"🧹 Pruned {pruned} ledger entries older than {CONFIG['ledger_days']} days.")
+        _seeded_days.add(today)
+
+    folded = 0
+    newest = watermark
+    query = {"updated_at": {"$gte": watermark - CONFIG["overlap"]}}
+    while True:
+        batch = list(queue_records.find(query).sort([("updated_at", 1), ("_id", 1)]).limit(CONFIG["batch_size"]))
+        if not batch:
+            break
+        folded += fold_records(batch)
+        last = batch[-1]
+        newest = max(newest, last["updated_at"])
+        # Page on (updated_at, _id) so a burst of equal timestamps cannot repeat the same batch
+        query = {"$or": [{"updated_at": {"$gt": last["updated_at"]}},
+                         {"updated_at": last["updated_at"], "_id": {"$gt": last["_id"]}}]}
+
+    if newest > watermark:
+        save_watermark(newest)
+    if folded:
+        print(f"✅ Folded {folded} changed records into stats.")
     else:
         print(f"⚠️ No new data found for {today}.")
 
+
 # Main loop to run every 20 seconds
 if __name__ == "__main__":
-    try:
-        while True:
-            run_aggregation()
-            time.sleep(20)
-    except KeyboardInterrupt:
-        print("\n🛑 Aggregator stopped by user.")
+    parser = argparse.ArgumentParser(description="Keeps CashierQueueStats up to date.")
+    parser.add_argument("--rebuild", metavar="YYYY-MM-DD", nargs="?", const="today",
+                        help="Rebuild one day's stats from the raw records and exit (default: today)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        day = datetime.now().strftime("%Y-%m-%d") if args.rebuild == "today" else args.rebuild
+        print(f"🔁 Rebuilt stats for {day} from {rebuild(day)} records.")
+    else:
+        try:
+            while True:
+                run_aggregation()
+                time.sleep(CONFIG["interval"])
+        except KeyboardInterrupt:
+            print("\n🛑 Aggregator stopped by user.")
@@ -1,5 +1,4 @@
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, g
-from pymongo import MongoClient
 from flask_session import Session
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -16,11 +15,7 @@ from controllers.Request.request_bp import request_bp
 from viewQueue_bp import viewQueue_bp
 
 # Office controls
-from controllers.Staff.csdl_blueprint import csdl_bp
-from controllers.Staff.cashier_blueprint import cashier_bp
-from controllers.Staff.marketing_blueprint import marketing_bp
-from controllers.Staff.business_blueprint import business_bp
-from controllers.Staff.registrar_blueprint import registrar_bp
+from controllers.Staff.office_engine import register_office_blueprints
 
 
 # Superadmin Controls
@@ -34,6 +29,10 @@ from controllers.Superadmin.adminControls_bp import adminControls_bp
 # Loggings
 from logs_bp import logs_bp
 
+from controllers.Shared.database import get_db
+from controllers.Shared.indexes import ensure_indexes
+from controllers.Shared.logger import init_request_timing
+
 # Load environment variables from .env
 load_dotenv()
 
@@ -42,13 +41,13 @@ CORS(app)
 app.secret_key = os.getenv('FLASK_SECRET_KEY')  # Load secret key from .env
 app.config['SESSION_TYPE'] = 'filesystem'
 Session(app)
+init_request_timing(app)  # Log records carry latency_ms
 
-# MongoDB Configuration
-mongo_uri = os.getenv('MONGO_URI')  # Load MongoDB URI from .env
-client = MongoClient(mongo_uri)
-db = client['QueueSystem']  # Database name
+# MongoDB Configuration (shared connection pool, MONGO_URI from .env)
+db = get_db()  # Database name
 users_collection = db['users']  # Users collection
 collection = db["QueueRecords"]  # Queue Collection
+ensure_indexes(db)  # Create any missing query indexes
 
 
 # Helper function to hash passwords
@@ -113,10 +112,11 @@ def check_role(role):
     return None  # No redirection needed, proceed with the route logic
 
 
-# CSDL ----------------------------------------------------------------
-app.register_blueprint(csdl_bp, url_prefix='/csdl_api')
+# Office APIs (/csdl_api, /cashier_api, /marketing_api, /business_api, /registrar_api)
+register_office_blueprints(app)
 
 
+# CSDL ----------------------------------------------------------------
 @app.route('/csdl')
 def csdl():
     if 'username' not in session or session['role'] != 'csdl':
@@ -125,9 +125,6 @@ def csdl():
 
 
 # Cashier --------------------------------------------------------------
-app.register_blueprint(cashier_bp, url_prefix='/cashier_api')
-
-
 @app.route('/cashier')
 def cashier():
     if 'username' not in session or session['role'] != 'cashier':
@@ -136,9 +133,6 @@ def cashier():
 
 
 # Marketing Office -----------------------------------------------------
-app.register_blueprint(marketing_bp, url_prefix='/marketing_api')
-
-
 @app.route('/marketing')
 def marketing():
     if 'username' not in session or session['role'] != 'marketing':
@@ -147,9 +141,6 @@ def marketing():
 
 
 # Business Office ------------------------------------------------------
-app.register_blueprint(business_bp, url_prefix='/business_api')
-
-
 @app.route('/business_office')
 def business_office():
     # Ensure the user is logged in
@@ -159,9 +150,6 @@ def business_office():
 
 
 # Registrar ----------------------------------------------------------
-app.register_blueprint(registrar_bp, url_prefix='/registrar_api')
-
-
 @app.route('/registrar')
 def registrar():
     if 'username' not in session or session['role'] != 'registrar':
@@ -0,0 +1,64 @@
+"""
+Queue numbers/second with many concurrent kiosk clients hitting the same {office}Counter document,
+for several lease sizes. Each "worker" has its own CounterLeases, as separate app processes would.
+
+    python -m benchmarks.bench_counters --clients 32 --workers 4 --numbers 500 --lease-sizes 1 10 50
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+
+from controllers.Request.counters import CounterLeases
+
+OFFICE = "CashierQueueRecords"
+
+
+def run(db, lease_size, workers, clients, numbers):
+    db[f"{OFFICE}Counter"].drop()
+    day = datetime.now().strftime("%Y-%m-%d")
+    leases = [CounterLeases(db, lease_size) for _ in range(workers)]
+    issued = [[] for _ in range(clients)]
+
+    def kiosk(index):
+        counters = leases[index % workers]
+        for _ in range(numbers):
+            issued[index].append(counters.next_number(OFFICE, "S", day))
+
+    threads = [threading.Thread(target=kiosk, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_numbers = [n for numbers_ in issued for n in numbers_]
+    assert len(all_numbers) == len(set(all_numbers)), "duplicate queue number issued"
+    assert all(a < b for numbers_ in issued for a, b in zip(numbers_, numbers_[1:])), "numbers went backwards"
+    print(f"lease {lease_size:>4}: {len(all_numbers) / elapsed:>10,.0f} numbers/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--numbers", type=int, default=200, help="Numbers requested per client")
+    parser.add_argument("--lease-sizes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--db-url", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--db-name", default="QueueSystemBench")
+    args = parser.parse_args()
+
+    client = MongoClient(args.db_url)
+    try:
+        for lease_size in args.lease_sizes:
+            run(client[args.db_name], lease_size, args.workers, args.clients, args.numbers)
+    finally:
+        client.drop_database(args.db_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Tickets/second through get_next_queue with many concurrent clerks in one office: the old two separate
+find_one_and_update calls versus complete_and_claim_next. Uses the MONGO_DB_NAME database
+(QueueSystemBench unless set), which is dropped afterwards.
+
+    python -m benchmarks.bench_dispatch --tickets 2000 --clerks 16
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_DB_NAME", "QueueSystemBench")
+
+from controllers.Shared.database import DB_CONFIG, get_client, supports_transactions  # noqa: E402
+from controllers.Shared.indexes import ensure_indexes  # noqa: E402
+from controllers.Staff.office_engine import complete_and_claim_next, db  # noqa: E402
+
+OFFICE = "CashierQueueRecords"
+
+
+def legacy_advance(collection_name, username, today):
+    """ The pre-transaction path: two separate calls, sorted on queueNumber as the old blueprints did. """
+    collection = db[collection_name]
+    current_queue = collection.find_one_and_update(
+        {"transaction": "In Process", "reserved_by": username, "day": today},
+        {"$set": {"transaction": "Completed", "reserved_by": username}},
+        return_document=True
+    )
+    next_queue = collection.find_one_and_update(
+        {"transaction": "On Queue", "reserved_by": None, "day": today},
+        {"$set": {"transaction": "In Process", "reserved_by": username}},
+        sort=[("priority", -1), ("queueNumber", 1)],
+        return_document=True
+    )
+    return current_queue, next_queue
+
+
+def seed(tickets, today):
+    db[OFFICE].drop()
+    # The app's own indexes, so complete_and_claim_next is measured with the plan it gets in production
+    ensure_indexes(db)
+    issued = datetime.now()
+    db[OFFICE].insert_many([{
+        "idNumber": f"{i:012d}", "queueNumber": f"S-{i:04d}-MAIN", "seq": i, "priority": False,
+        "transaction": "On Queue", "reserved_by": None, "day": today,
+        "created_at": issued + timedelta(milliseconds=i)
+    } for i in range(1, tickets + 1)])
+
+
+def run(label, advance, tickets, clerks):
+    today = datetime.now().strftime("%Y-%m-%d")
+    seed(tickets, today)
+
+    def clerk(index):
+        while True:
+            _, next_queue = advance(OFFICE, f"clerk{index}", today)
+            if next_queue is None:
+                break
+
+    threads = [threading.Thread(target=clerk, args=(i,)) for i in range(clerks)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    completed = db[OFFICE].count_documents({"transaction": "Completed"})
+    assert completed == tickets, f"{completed} of {tickets} tickets completed"
+    print(f"{label:<24} {tickets / elapsed:>8,.0f} tickets/s with {clerks} clerks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--clerks", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"Transactions supported: {supports_transactions()}")
+    try:
+        run("two calls", legacy_advance, args.tickets, args.clerks)
+        run("complete_and_claim_next", complete_and_claim_next, args.tickets, args.clerks)
+    finally:
+        get_client().drop_database(DB_CONFIG["db_name"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Tickets/second for kiosk issuance: the old five-step chain versus RequestConsole.issue_ticket.
+Both sides include the position lookup request_queue does after issuing.
+Uses the MONGO_DB_NAME database (QueueSystemBench unless set), which is dropped afterwards.
+
+    python -m benchmarks.bench_issuance --tickets 2000
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+os.environ.setdefault("MONGO_DB_NAME", "QueueSystemBench")
+
+from controllers.Request.request_bp import RequestConsole  # noqa: E402
+from controllers.Shared.database import DB_CONFIG, supports_transactions  # noqa: E402
+from controllers.Shared.indexes import ensure_indexes  # noqa: E402
+
+OFFICE = "CashierQueueRecords"
+
+
+def legacy_issue(console, id_number, role, section, office, priority=False):
+    """ The pre-transaction issuance path: regex duplicate check, counter reset, $inc, insert, full-queue scan. """
+    today_date = datetime.now().strftime("%Y-%m-%d")
+    if id_number and console.db[office].find_one({
+        "idNumber": id_number,
+        "date": {"$regex": f"^{today_date}"},
+        "transaction": {"$nin": ["Cut Off/Cancelled", "Completed"]}
+    }):
+        return None
+
+    queue_prefix = "P" if priority else "S"
+    counter_filter = {"type": "queue_reset", "date": today_date, "queue_type": queue_prefix}
+    if not console.db[f"{office}Counter"].find_one(counter_filter):
+        console.db[f"{office}Counter"].insert_one({**counter_filter, "last_counter": 0})
+
+    counter_doc = console.db[f"{office}Counter"].find_one_and_update(
+        counter_filter, {"$inc": {"last_counter": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    queue_number = f"{queue_prefix}-{counter_doc['last_counter']:04d}-{section.upper()}"
+    console.db[office].insert_one({
+        "idNumber": id_number,
+        "role": role,
+        "section": section.upper(),
+        "queueNumber": queue_number,
+        "priority": priority,
+        "transaction": "On Queue",
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    })
+    waiting = console.db[office].find({"transaction": "On Queue", "date": {"$regex": f"^{today_date}"}})
+    for record in waiting.sort([("priority", -1), ("queueNumber", 1)]):
+        if record["queueNumber"] == queue_number:
+            break
+    return queue_number
+
+
+def new_issue(console, id_number, role, section, office, priority=False):
+    """ What request_queue does per ticket: issue_ticket, then the rank count for its position. """
+    ticket = console.issue_ticket(id_number, role, section, office, priority)
+    if ticket is None:
+        return None
+    console.calculate_estimated_wait_time(ticket["queueNumber"], office, ticket)
+    return ticket["queueNumber"]
+
+
+def run(label, issue, console, tickets):
+    console.db[OFFICE].drop()
+    console.db[f"{OFFICE}Counter"].drop()
+    # drop() takes the indexes with it; the new path needs one_active_id and day_queue_order back
+    ensure_indexes(console.db)
+
+    start = time.perf_counter()
+    for i in range(tickets):
+        issue(console, f"{i:012d}", "Student", "Main", OFFICE)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {tickets} tickets in {elapsed:.2f}s  ->  {tickets / elapsed:,.0f} tickets/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=1000)
+    args = parser.parse_args()
+
+    console = RequestConsole()
+    print(f"Transactions supported: {supports_transactions(console.client)}")
+    try:
+        run("legacy", legacy_issue, console, args.tickets)
+        run("issue_ticket", new_issue, console, args.tickets)
+    finally:
+        console.client.drop_database(DB_CONFIG["db_name"])
+
+
+if __name__ == "__main__":
+    main()
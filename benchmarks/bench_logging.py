@@ -0,0 +1,106 @@
+"""
+Per-call cost seen by request threads: the old basicConfig FileHandler (format and write on the
+caller) against the QueueHandler pipeline from controllers.Shared.logger, plus sampled status polls.
+Writes into a temporary directory.
+
+    python -m benchmarks.bench_logging --records 20000 --threads 8
+    python -m benchmarks.bench_logging --records 2000 --threads 8 --io-delay-us 200
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from controllers.Shared import logger as log_setup
+
+
+def run_threads(log, records, threads, extra=None):
+    """ Returns per-call latencies in microseconds across all threads. """
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(n):
+        local = []
+        for i in range(records):
+            started = time.perf_counter()
+            log.info(f"User clerk{n} requested the next queue. ({i})", extra=extra)
+            local.append((time.perf_counter() - started) * 1e6)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies
+
+
+def slow_down(handler, delay):
+    """ Adds delay seconds to every write, standing in for a busy or network-mounted disk. """
+    emit = handler.emit
+
+    def slow_emit(record):
+        time.sleep(delay)
+        emit(record)
+
+    handler.emit = slow_emit
+
+
+def report(label, latencies, wall):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<28} mean {statistics.mean(latencies):7.2f} us  p99 {p99:8.2f} us  "
+          f"{len(latencies) / wall:10.0f} calls/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000, help="Records per thread")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--io-delay-us", type=float, default=0.0, help="Extra cost per file write, in microseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Old setup: every call formats and writes to the file under the handler lock
+        legacy = logging.getLogger("bench.legacy")
+        legacy.propagate = False
+        legacy.setLevel(logging.INFO)
+        handler = logging.FileHandler(os.path.join(tmp, "legacy.log"))
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        legacy.addHandler(handler)
+        if args.io_delay_us:
+            slow_down(handler, args.io_delay_us / 1e6)
+
+        started = time.perf_counter()
+        latencies = run_threads(legacy, args.records, args.threads)
+        report("basicConfig FileHandler", latencies, time.perf_counter() - started)
+        handler.close()
+
+        log_setup.LOG_CONFIG["path"] = os.path.join(tmp, "queue_system.log")
+        log_setup.LOG_CONFIG["admin_path"] = os.path.join(tmp, "admin_console.log")
+        log_setup.configure_logging()
+        if args.io_delay_us:
+            for pipeline_handler in log_setup._listener.handlers:
+                slow_down(pipeline_handler, args.io_delay_us / 1e6)
+        pipeline = logging.getLogger("bench.pipeline")
+
+        started = time.perf_counter()
+        latencies = run_threads(pipeline, args.records, args.threads)
+        report("QueueHandler pipeline", latencies, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        latencies = run_threads(pipeline, args.records, args.threads, extra={"sample": "queue_status"})
+        report("sampled status poll", latencies, time.perf_counter() - started)
+
+        # Drain what the listener still holds before the directory goes away
+        started = time.perf_counter()
+        log_setup.shutdown_logging()
+        print(f"listener drained its backlog in {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Tickets/second through the print spooler with a fake printer, compared with the old per-ticket
+open/claim, a dozen writes, then release cycle.
+
+    python -m benchmarks.bench_printing --tickets 500 --write-delay 0.002 --open-delay 0.05
+"""
+import argparse
+import time
+
+from controllers.Request.printer import FakePrinterBackend, PrintSpooler, build_ticket
+
+
+class SlowOpenBackend(FakePrinterBackend):
+    """ Fake printer that also charges for USB enumeration and interface claiming. """
+
+    def __init__(self, write_delay, open_delay):
+        super().__init__(write_delay)
+        self.open_delay = open_delay
+
+    def open(self):
+        time.sleep(self.open_delay)
+        super().open()
+
+
+def per_ticket_session(backend, tickets):
+    """ The old print_ticket: open the device, write each command separately, then close it. """
+    for i in range(tickets):
+        backend.open()
+        for chunk in build_ticket("CASHIER", f"S-{i:04d}-MAIN", "2025-01-01").split(b'\n'):
+            backend.write(chunk + b'\n')
+        backend.close()
+
+
+def spooled(backend, tickets):
+    spooler = PrintSpooler(backend, queue_size=tickets)
+    start = time.perf_counter()
+    for i in range(tickets):
+        spooler.submit(build_ticket("CASHIER", f"S-{i:04d}-MAIN", "2025-01-01"))
+    enqueue = time.perf_counter() - start
+    spooler.join()
+    return enqueue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--write-delay", type=float, default=0.002, help="Seconds per USB write")
+    parser.add_argument("--open-delay", type=float, default=0.05, help="Seconds per device open")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    per_ticket_session(SlowOpenBackend(args.write_delay, args.open_delay), args.tickets)
+    elapsed = time.perf_counter() - start
+    print(f"per-ticket session  {args.tickets / elapsed:,.1f} tickets/s (request blocked the whole time)")
+
+    start = time.perf_counter()
+    enqueue = spooled(SlowOpenBackend(args.write_delay, args.open_delay), args.tickets)
+    elapsed = time.perf_counter() - start
+    print(f"spooler             {args.tickets / elapsed:,.1f} tickets/s, "
+          f"{enqueue / args.tickets * 1e6:,.1f} us blocked per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import atexit
+import logging
+import os
+import threading
+
+from pymongo import ReturnDocument, errors
+
+COUNTER_CONFIG = {
+    # Numbers reserved per round trip. 1 keeps numbering strictly in issue order across workers;
+    # larger blocks remove the hot counter document but interleave numbers between workers, so a
+    # ticket can show a lower number than one issued before it. Serving order is unaffected: queues
+    # are ordered by created_at (indexes.QUEUE_ORDER), not by the number.
+    "lease_size": int(os.getenv("COUNTER_LEASE_SIZE", "1"))
+}
+
+
+class CounterLeases:
+    """
+    Hands out queue numbers per office, queue type and day from blocks leased with one $inc.
+    Each worker's numbers are monotonic; unused numbers are returned on shutdown when nobody
+    has leased past them, otherwise they are skipped.
+    """
+
+    def __init__(self, db, lease_size=COUNTER_CONFIG["lease_size"]):
+        self.db = db
+        self.lease_size = max(1, lease_size)
+        self._leases = {}  # (office, queue_type, day) -> [next_number, last_number]
+        self._lock = threading.Lock()
+        atexit.register(self.release_all)
+
+    def _counter_filter(self, queue_type, day):
+        return {"type": "queue_reset", "date": day, "queue_type": queue_type}
+
+    def next_number(self, office, queue_type, day, session=None):
+        if self.lease_size == 1:
+            # No block to keep in memory, so the $inc can join the caller's transaction
+            counter_doc = self.db[f"{office}Counter"].find_one_and_update(
+                self._counter_filter(queue_type, day),
+                {"$inc": {"last_counter": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            return counter_doc["last_counter"]
+
+        key = (office, queue_type, day)
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or lease[0] > lease[1]:
+                # Leased outside any transaction: a rolled-back $inc would hand out the same block twice
+                counter_doc = self.db[f"{office}Counter"].find_one_and_update(
+                    self._counter_filter(queue_type, day),
+                    {"$inc": {"last_counter": self.lease_size}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                last = counter_doc["last_counter"]
+                lease = [last - self.lease_size + 1, last]
+                self._leases = {k: v for k, v in self._leases.items() if k[2] == day}
+                self._leases[key] = lease
+
+            number = lease[0]
+            lease[0] += 1
+            return number
+
+    def reserve_range(self, office, queue_type, day, count, session=None):
+        """ Reserves count contiguous numbers with one $inc and returns the first of them. """
+        counter_doc = self.db[f"{office}Counter"].find_one_and_update(
+            self._counter_filter(queue_type, day),
+            {"$inc": {"last_counter": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        return counter_doc["last_counter"] - count + 1
+
+    def release_all(self):
+        """ Gives back the unused tail of each lease if it is still the top of its counter. """
+        with self._lock:
+            for (office, queue_type, day), (next_number, last) in self._leases.items():
+                unused = last - next_number + 1
+                if unused <= 0:
+                    continue
+                try:
+                    self.db[f"{office}Counter"].update_one(
+                        {**self._counter_filter(queue_type, day), "last_counter": last},
+                        {"$inc": {"last_counter": -unused}}
+                    )
+                except errors.PyMongoError as e:
+                    logging.warning(f"Could not release {unused} leased numbers for {office} {queue_type}: {e}")
+            self._leases = {}
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo import errors
+
+IDEMPOTENCY_CONFIG = {
+    "max_entries": 10000,
+    "ttl": 600,  # Seconds a key keeps returning its first response
+    "wait_timeout": 10,  # Seconds a retry waits for the original request still in flight
+    "poll_interval": 0.2,  # Seconds between checks of a key another worker is still processing
+    "mongo_backed": os.getenv("IDEMPOTENCY_MONGO", "0") == "1",  # Share keys across workers
+    "collection_name": "IdempotencyKeys"
+}
+
+STILL_PROCESSING = {"error": "A request with this Idempotency-Key is still being processed."}, 409
+KEY_REUSED = {"error": "This Idempotency-Key was already used with a different request body."}, 422
+
+
+def fingerprint(body):
+    """ Hash of a JSON request body, independent of key order. """
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Bounded LRU of Idempotency-Key -> (status, response) with expiry, optionally backed by a
+    Mongo collection with a TTL index so retries landing on another worker are answered too.
+    Each key remembers the fingerprint of the body it was first used with; reusing it with a
+    different body is refused with 422 instead of answering with another request's ticket.
+    """
+
+    def __init__(self, collection=None, max_entries=IDEMPOTENCY_CONFIG["max_entries"],
+                 ttl=IDEMPOTENCY_CONFIG["ttl"]):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, fingerprint, result)
+        self._in_flight = {}  # key -> (fingerprint, threading.Event)
+        self._lock = threading.Lock()
+
+        if collection is not None:
+            try:
+                collection.create_index("created_at", expireAfterSeconds=ttl)
+            except errors.PyMongoError as e:
+                logging.warning(f"Could not create idempotency TTL index: {e}")
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def _put_local(self, key, body_hash, result):
+        self._entries[key] = (time.monotonic() + self.ttl, body_hash, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _claim_shared(self, key, body_hash):
+        """
+        Inserts a placeholder for key so only one worker runs the request. Returns None when this worker
+        owns the key (or there is no shared store), else the result the owner produced: its stored
+        response, KEY_REUSED or STILL_PROCESSING.
+        """
+        if self.collection is None:
+            return None
+        deadline = time.monotonic() + IDEMPOTENCY_CONFIG["wait_timeout"]
+        try:
+            while True:
+                try:
+                    self.collection.insert_one({"_id": key, "fingerprint": body_hash, "created_at": datetime.utcnow()})
+                    return None
+                except errors.DuplicateKeyError:
+                    pass
+
+                doc = self.collection.find_one({"_id": key})
+                if doc is None:
+                    continue  # Released by a failed owner; claim it again
+                if doc["created_at"] < datetime.utcnow() - timedelta(seconds=self.ttl):
+                    # Expired but not yet removed by the TTL monitor
+                    self.collection.delete_one({"_id": key, "created_at": doc["created_at"]})
+                    continue
+                if doc.get("fingerprint") != body_hash:
+                    return KEY_REUSED
+                if "response" in doc:
+                    return doc["status"], doc["response"]
+                if time.monotonic() >= deadline:
+                    return STILL_PROCESSING
+                time.sleep(IDEMPOTENCY_CONFIG["poll_interval"])
+        except errors.PyMongoError as e:
+            logging.warning(f"Idempotency claim failed, processing without it: {e}")
+            return None
+
+    def _put_shared(self, key, result):
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one({"_id": key}, {"$set": {"status": result[0], "response": result[1]}})
+        except errors.PyMongoError as e:
+            logging.warning(f"Idempotency store failed: {e}")
+
+    def _release_shared(self, key):
+        if self.collection is None:
+            return
+        try:
+            self.collection.delete_one({"_id": key, "response": {"$exists": False}})
+        except errors.PyMongoError as e:
+            logging.warning(f"Idempotency release failed: {e}")
+
+    def run(self, key, body, handler):
+        """
+        Returns the stored (status, response) for key, or calls handler() once and stores its result.
+        A retry arriving while the first call is still running waits for it instead of re-running it.
+        body is the request body; a key reused with a different one gets a 422.
+        """
+        body_hash = fingerprint(body)
+        while True:
+            with self._lock:
+                entry = self._get_local(key)
+                if entry is not None:
+                    stored_hash, result = entry
+                    return result if stored_hash == body_hash else KEY_REUSED
+                in_flight = self._in_flight.get(key)
+                if in_flight is None:
+                    pending = threading.Event()
+                    self._in_flight[key] = (body_hash, pending)
+                    break
+            if in_flight[0] != body_hash:
+                return KEY_REUSED
+            if not in_flight[1].wait(IDEMPOTENCY_CONFIG["wait_timeout"]):
+                return STILL_PROCESSING
+
+        try:
+            result = self._claim_shared(key, body_hash)
+            if result is None:
+                try:
+                    result = handler()
+                except Exception:
+                    # Let a retry run the request again rather than wait on a key that will never complete
+                    self._release_shared(key)
+                    raise
+                self._put_shared(key, result)
+            elif result is KEY_REUSED or result is STILL_PROCESSING:
+                return result
+            with self._lock:
+                self._put_local(key, body_hash, result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.set()
@@ -0,0 +1,267 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+
+# Repository root, so the logo and its cache do not depend on the working directory
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRINTER_CONFIG = {
+    "id_vendor": 0x0FE6,
+    "id_product": 0x811E,
+    "backend": os.getenv("PRINTER_BACKEND", "usb"),  # "usb" or "fake"
+    "queue_size": 100,
+    "reconnect_delay": 2.0,  # Seconds between reconnect attempts
+    "max_attempts": 3,  # Tries per ticket (opening the printer or writing to it) before it is dropped
+    "max_job_age": 60,  # Seconds after which a queued ticket is dropped instead of printed late
+    "printer_width": 384,  # Printable dots per line (384 for 58 mm paper, 576 for 80 mm)
+    "logo_path": os.path.join(APP_ROOT, "static", "images", "au-logo.png"),
+    "logo_cache_dir": os.getenv("ESCPOS_CACHE_DIR", os.path.join(APP_ROOT, "cache", "escpos"))
+}
+
+# ESC/POS COMMANDS
+ESC_RESET = b'\x1b\x40'  # ESC @ (Reset printer)
+ESC_CENTER = b'\x1b\x61\x01'  # Center align
+ESC_DOUBLE_HEIGHT = b'\x1b\x21\x10'  # Double height text
+ESC_DOUBLE_WIDTH = b'\x1b\x21\x20'  # Double width text
+ESC_CUT = b'\x1d\x56\x00'  # Cut paper
+GS_RASTER = b'\x1d\x76\x30\x00'  # GS v 0 (Print raster bit image, normal size)
+
+_logo_cache = {}
+
+
+def rasterize_logo(path, printer_width):
+    """ Dithers an image to 1-bit and packs it as a GS v 0 raster command. """
+    from PIL import Image
+
+    image = Image.open(path)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(background, image)
+
+    # Raster rows are sent in whole bytes, so the width must be a multiple of 8 dots
+    width = min(image.width, printer_width) // 8 * 8
+    height = max(1, round(image.height * width / image.width))
+    image = image.convert("L").resize((width, height), Image.LANCZOS)
+
+    # Mode "1" uses Floyd-Steinberg dithering and sets bits for white; ESC/POS sets bits for black
+    data = bytes(b ^ 0xFF for b in image.convert("1").tobytes())
+
+    width_bytes = width // 8
+    header = GS_RASTER + bytes([width_bytes & 0xFF, width_bytes >> 8, height & 0xFF, height >> 8])
+    return header + data
+
+
+def get_logo_raster(path=PRINTER_CONFIG["logo_path"], printer_width=PRINTER_CONFIG["printer_width"]):
+    """
+    Returns the logo's raster command, converting it at most once.
+    Conversions are cached in memory and on disk, keyed by the image's hash and the printer width.
+    The disk cache is optional: when it cannot be read or written the logo is simply converted again.
+    """
+    cached = _logo_cache.get((path, printer_width))
+    if cached is not None:
+        return cached
+
+    try:
+        with open(path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()[:16]
+        cache_file = os.path.join(PRINTER_CONFIG["logo_cache_dir"], f"{digest}-{printer_width}.bin")
+        raster = None
+        try:
+            with open(cache_file, "rb") as file:
+                raster = file.read()
+        except OSError:
+            pass  # Not converted yet, or the cache directory is unreadable
+
+        if raster is None:
+            raster = rasterize_logo(path, printer_width)
+            try:
+                os.makedirs(PRINTER_CONFIG["logo_cache_dir"], exist_ok=True)
+                # Written aside and renamed, so a failed write never leaves a truncated raster behind
+                with open(f"{cache_file}.tmp", "wb") as file:
+                    file.write(raster)
+                os.replace(f"{cache_file}.tmp", cache_file)
+                logging.info(f"Logo rasterized to {cache_file} ({len(raster)} bytes).")
+            except OSError as e:
+                logging.warning(f"Could not cache ticket logo in {PRINTER_CONFIG['logo_cache_dir']}: {e}")
+    except Exception as e:
+        logging.error(f"Could not prepare ticket logo: {e}")
+        raster = b''
+
+    _logo_cache[(path, printer_width)] = raster
+    return raster
+
+
+def build_ticket(department, queue_number, today_date):
+    """ Builds the whole ESC/POS ticket as one buffer so it goes out in a single write. """
+    return b''.join([
+        ESC_RESET,
+        ESC_CENTER + get_logo_raster(), b'\n',
+        ESC_CENTER + ESC_DOUBLE_HEIGHT,
+        f"{department.upper()}\n".encode('utf-8'), b'\n',
+        ESC_CENTER + ESC_DOUBLE_WIDTH,
+        b"QUEUE NUMBER\n",
+        ESC_DOUBLE_HEIGHT + f"{queue_number}\n".encode('utf-8'), b'\n',
+        ESC_CENTER,
+        f"Date: {today_date}\n".encode('utf-8'), b'\n',
+        ESC_CENTER,
+        b"Please wait for your turn.\n", b'\n\n',
+        ESC_CUT
+    ])
+
+
+class UsbPrinterBackend:
+    """ Keeps the thermal printer's interface claimed between tickets. """
+
+    def __init__(self, id_vendor=PRINTER_CONFIG["id_vendor"], id_product=PRINTER_CONFIG["id_product"]):
+        self.id_vendor = id_vendor
+        self.id_product = id_product
+        self.dev = None
+        self.intf = None
+        self.ep_out = None
+
+    def open(self):
+        import usb.core
+        import usb.util
+
+        dev = usb.core.find(idVendor=self.id_vendor, idProduct=self.id_product)
+        if dev is None:
+            raise IOError("Printer not detected.")
+
+        dev.set_configuration()
+        intf = dev.get_active_configuration()[(0, 0)]
+        usb.util.claim_interface(dev, intf.bInterfaceNumber)
+
+        ep_out = usb.util.find_descriptor(
+            intf,
+            custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_OUT,
+        )
+        if ep_out is None:
+            usb.util.release_interface(dev, intf.bInterfaceNumber)
+            usb.util.dispose_resources(dev)
+            raise IOError("Printer has no OUT endpoint.")
+
+        self.dev, self.intf, self.ep_out = dev, intf, ep_out
+
+    def write(self, payload):
+        self.ep_out.write(payload)
+
+    def close(self):
+        if self.dev is None:
+            return
+        import usb.util
+
+        try:
+            usb.util.release_interface(self.dev, self.intf.bInterfaceNumber)
+            usb.util.dispose_resources(self.dev)  # Free resources to avoid conflicts
+        except Exception as e:
+            logging.warning(f"Error releasing printer: {e}")
+        self.dev = self.intf = self.ep_out = None
+
+
+class FakePrinterBackend:
+    """ Stands in for the printer so the spooler can be run and benchmarked without hardware. """
+
+    def __init__(self, write_delay=0.0):
+        self.write_delay = write_delay
+        self.opened = 0
+        self.writes = []
+
+    def open(self):
+        self.opened += 1
+
+    def write(self, payload):
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        self.writes.append(payload)
+
+    def close(self):
+        pass
+
+
+class PrintSpooler:
+    """ Single worker thread that owns the printer and drains a bounded job queue. """
+
+    def __init__(self, backend, queue_size=PRINTER_CONFIG["queue_size"]):
+        self.backend = backend
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.connected = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="print-spooler", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, payload):
+        """ Queues a ticket without blocking the caller. Returns False when the queue is full. """
+        self.start()
+        try:
+            self.jobs.put_nowait((time.monotonic(), payload))
+            return True
+        except queue.Full:
+            logging.error("Print queue is full, ticket dropped.")
+            return False
+
+    def join(self):
+        """ Blocks until every queued ticket has been handled. """
+        self.jobs.join()
+
+    def _connect(self):
+        """ One attempt to open the printer; returns whether it is connected. """
+        if self.connected:
+            return True
+        try:
+            self.backend.open()
+            self.connected = True
+            logging.info("Printer connected.")
+        except Exception as e:
+            logging.warning(f"Printer unavailable: {e}")
+        return self.connected
+
+    def _disconnect(self):
+        self.connected = False
+        self.backend.close()
+
+    def _print(self, submitted_at, payload):
+        for attempt in range(1, PRINTER_CONFIG["max_attempts"] + 1):
+            # The kiosk user is long gone; a ticket printed now would only confuse the next person
+            age = time.monotonic() - submitted_at
+            if age > PRINTER_CONFIG["max_job_age"]:
+                logging.error(f"Ticket dropped after waiting {age:.0f}s for the printer.")
+                return
+            if attempt > 1:
+                time.sleep(PRINTER_CONFIG["reconnect_delay"])
+            if not self._connect():
+                continue
+            try:
+                self.backend.write(payload)
+                return
+            except Exception as e:
+                logging.error(f"Printing error (attempt {attempt}): {e}")
+                self._disconnect()
+        logging.error("Ticket dropped after repeated printing errors.")
+
+    def _run(self):
+        while True:
+            submitted_at, payload = self.jobs.get()
+            try:
+                self._print(submitted_at, payload)
+            finally:
+                self.jobs.task_done()
+
+
+def create_backend(name=PRINTER_CONFIG["backend"]):
+    if name == "fake":
+        return FakePrinterBackend()
+    return UsbPrinterBackend()
+
+
+print_spooler = PrintSpooler(create_backend())
+get_logo_raster()  # Convert the logo once at startup rather than on the first ticket
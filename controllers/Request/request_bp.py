@@ -1,56 +1,38 @@
-from flask import Blueprint, jsonify, request
-from pymongo import MongoClient, errors
+from flask import Blueprint, jsonify, request, session
+from pymongo import errors
 from datetime import datetime, timedelta
 import logging
-import usb.core
-import usb.util
+from controllers.Request.counters import CounterLeases
+from controllers.Request.idempotency import IdempotencyStore, IDEMPOTENCY_CONFIG
+from controllers.Shared.active_ids import active_ids
+from controllers.Shared.database import get_db, run_atomic
+from controllers.Shared.indexes import QUEUE_ORDER
+from controllers.Shared.logger import configure_logging
+from controllers.Shared.summary import ensure_summary, record_issued
+from controllers.Request.printer import print_spooler, build_ticket
 
 request_bp = Blueprint('request', __name__)
 
-# Configure logging
-logging.basicConfig(
-    filename="logs/queue_system.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Logging Configuration: shared, non-blocking JSON pipeline
+configure_logging()
 
 CONFIG = {
     "open_hours": {"start": "06:00", "end": "17:00"},
     "lunch_hours": {"start": "12:00", "end": "13:00"},
     "valid_sections": {"1": "Main", "2": "South"},
     "queue_collections": ["CashierQueueRecords", "MarketingQueueRecords", "BusinessOfficeQueueRecords",
-                          "CSDLQueueRecords", "RegistrarQueueRecords"]
+                          "CSDLQueueRecords", "RegistrarQueueRecords"],
+    # Group issuance is a staff action, not a kiosk one
+    "bulk_roles": ["superadmin", "csdl", "cashier", "marketing", "business_office", "registrar"],
+    "bulk_max_tickets": 50  # Most tickets (IDs x offices) one bulk request may create
 }
 
 
 class RequestConsole:
-    def __init__(self, db_url="mongodb://localhost:27017/", db_name="QueueSystem"):
-        try:
-            self.client = MongoClient(db_url)
-            self.db = self.client[db_name]
-        except errors.ConnectionFailure as e:
-            logging.error(f"Failed to connect to MongoDB: {e}")
-            raise
-
-    def reset_queue_counter_if_needed(self, office, priority):
-        queue_type = "P" if priority else "S"
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        # Check and reset specific queue type counter
-        counter_doc = self.db[f"{office}Counter"].find_one({
-            "type": "queue_reset",
-            "date": today,
-            "queue_type": queue_type
-        })
-
-        if not counter_doc:
-            self.db[f"{office}Counter"].insert_one({
-                "type": "queue_reset",
-                "date": today,
-                "queue_type": queue_type,
-                "last_counter": 0
-            })
-            logging.info(f"Queue counter reset for {office} {queue_type} on {today}")
+    def __init__(self, db=None):
+        self.db = db if db is not None else get_db()
+        self.client = self.db.client
+        self.counters = CounterLeases(self.db)
 
     def check_open_hours(self):
         now = datetime.now()
@@ -73,43 +55,82 @@ class RequestConsole:
             return id_number, "Student", section
         return None, None, None
 
-    def is_duplicate_request(self, id_number, office):
-        if not id_number:
-            return False
+    def calculate_estimated_wait_time(self, queue_number, office, ticket=None):
+        """ Position and wait for a waiting ticket; pass the ticket when the caller already holds it. """
         today = datetime.now().strftime("%Y-%m-%d")
+        waiting = {"transaction": "On Queue", "day": today}
 
-        # Only consider active queue entries (not cancelled/completed)
-        existing = self.db[office].find_one({
-            "idNumber": id_number,
-            "date": {"$regex": f"^{today}"},
-            "transaction": {"$nin": ["Cut Off/Cancelled", "Completed"]}  # Match exact status
-        })
-        return existing is not None
-
-    def calculate_estimated_wait_time(self, queue_number, office):
-        today = datetime.now().strftime("%Y-%m-%d")
-        # Get all queue entries sorted by priority first, then queue number
-        queue_records = list(self.db[office].find({
-            "transaction": "On Queue",
-            "date": {"$regex": f"^{today}"}
-        }).sort([
-            ("priority", -1),  # Priority first
-            ("queueNumber", 1)
-        ]))
-
-        current_position = None
-        for index, record in enumerate(queue_records):
-            if record["queueNumber"] == queue_number:
-                current_position = index + 1
-                break
-
-        if current_position is None:
+        if ticket is None:
+            # Point lookup on day_queue_number
+            ticket = self.db[office].find_one({**waiting, "queueNumber": queue_number},
+                                              {field: 1 for field, _ in QUEUE_ORDER})
+        if ticket is None:
             return None, "N/A"
 
+        # Tickets ahead, in QUEUE_ORDER: same priority and issued earlier (seq only breaks ties within a
+        # batch, since P and S numbers come from separate counters), plus every priority ticket if this
+        # one is standard
+        ahead = [
+            {"priority": ticket["priority"], "created_at": {"$lt": ticket["created_at"]}},
+            {"priority": ticket["priority"], "created_at": ticket["created_at"], "seq": {"$lt": ticket["seq"]}}
+        ]
+        if not ticket["priority"]:
+            ahead.append({"priority": True})
+        current_position = self.db[office].count_documents({**waiting, "$or": ahead}) + 1
+
         # Calculate based on position in the merged queue
         estimated_time = f"{(current_position - 1) * 1.5} minutes"
         return current_position, estimated_time
 
+    def issue_ticket(self, id_number, role, section, office, priority=False):
+        """
+        Rejects IDs already holding a ticket, then reserves the next number and stores the ticket in one transaction.
+        Returns the inserted ticket, or None when the ID already holds an active ticket today. The in-memory
+        reservation stops concurrent requests in this process; the one_active_id unique index stops the rest.
+        """
+        queue_prefix = "P" if priority else "S"
+
+        if not active_ids.reserve(office, id_number):
+            return None
+
+        now = datetime.now()
+        today_date = now.strftime("%Y-%m-%d")
+
+        def _issue(session=None):
+
+            # The counter upsert creates today's document on first use, so no separate reset step is needed
+            queue_counter = self.counters.next_number(office, queue_prefix, today_date, session=session)
+            ticket = {
+                "idNumber": id_number,
+                "role": role,
+                "section": section.upper(),
+                "queueNumber": f"{queue_prefix}-{queue_counter:04d}-{section.upper()}",
+                "seq": queue_counter,
+                "priority": priority,
+                "transaction": "On Queue",
+                "date": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "day": today_date,
+                "created_at": now,
+                "updated_at": datetime.utcnow()  # Watermark for the stats aggregator
+            }
+            if id_number:
+                ticket["active"] = True  # Unset when the ticket is completed or cancelled
+            self.db[office].insert_one(ticket, session=session)
+            return ticket
+
+        try:
+            ensure_summary(self.db, office, today_date)
+            ticket = run_atomic(_issue, self.client)
+            record_issued(self.db, office, today_date, 1)
+            active_ids.add(office, id_number)
+        except errors.DuplicateKeyError:
+            logging.warning(f"Rejected a concurrent duplicate ticket for {id_number} in {office}.")
+            return None
+        finally:
+            # Frees the ID when the insert failed; after add() it is already in the set
+            active_ids.release(office, id_number)
+        return ticket
+
     def request_queue(self, id_input, office, priority=False):
         if not self.check_open_hours():
             return {"error": "Queue is closed during non-operational hours."}
@@ -121,45 +142,17 @@ class RequestConsole:
         if office not in CONFIG["queue_collections"]:
             return {"error": "Invalid office selection."}
 
-        if self.is_duplicate_request(id_number, office):
+        ticket = self.issue_ticket(id_number, role, section, office, priority)
+        if ticket is None:
             return {"error": "Duplicate request. You have already queued today."}
 
-        self.reset_queue_counter_if_needed(office, priority)
-        queue_prefix = "P" if priority else "S"
-        today_date = datetime.now().strftime("%Y-%m-%d")
-
-        # Get separate counter for priority/standard
-        counter_doc = self.db[f"{office}Counter"].find_one_and_update(
-            {
-                "type": "queue_reset",
-                "date": today_date,
-                "queue_type": queue_prefix  # Add queue type distinction
-            },
-            {"$inc": {"last_counter": 1}, "$setOnInsert": {
-                "date": today_date,
-                "queue_type": queue_prefix
-            }},
-            upsert=True,
-            return_document=True
-        )
-
-        queue_counter = counter_doc["last_counter"]
-        queue_number = f"{queue_prefix}-{queue_counter:04d}-{section.upper()}"
+        queue_number = ticket["queueNumber"]
+        today_date = ticket["day"]
         officeStrip = office.removesuffix("QueueRecords")
 
         print(f"Generated Queue Number: {queue_number}  {id_number}  {officeStrip}")
 
-        self.db[office].insert_one({
-            "idNumber": id_number,
-            "role": role,
-            "section": section.upper(),
-            "queueNumber": queue_number,
-            "priority": priority,
-            "transaction": "On Queue",
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-
-        position, estimated_time = self.calculate_estimated_wait_time(queue_number, office)
+        position, estimated_time = self.calculate_estimated_wait_time(queue_number, office, ticket)
 
         self.print_ticket(office, queue_number, today_date)
 
@@ -169,85 +162,176 @@ class RequestConsole:
             "position": position,
             "estimated_wait_time": estimated_time
         }
+    def request_queue_bulk(self, id_inputs, offices, priority=False):
+        """
+        Queues every ID at every listed office. Each office gets one contiguous counter range,
+        one insert_many and one batched print job; rejected IDs are reported per office.
+        """
+        if not self.check_open_hours():
+            return {"error": "Queue is closed during non-operational hours."}
+
+        invalid_offices = [office for office in offices if office not in CONFIG["queue_collections"]]
+        if invalid_offices:
+            return {"error": f"Invalid office selection: {', '.join(invalid_offices)}."}
+
+        parsed, rejected = [], []
+        for id_input in id_inputs:
+            id_number, role, section = self.parse_id_input(str(id_input))
+            if not role:
+                rejected.append({"id_input": id_input, "error": "Invalid ID input."})
+            else:
+                parsed.append((id_input, id_number, role, section))
+
+        queue_prefix = "P" if priority else "S"
+        tickets = []
+        for office in offices:
+            accepted = []
+            for id_input, id_number, role, section in parsed:
+                # Also rejects an ID listed twice in the batch, since its first copy holds the reservation
+                if not active_ids.reserve(office, id_number):
+                    rejected.append({"id_input": id_input, "office": office,
+                                     "error": "Duplicate request. You have already queued today."})
+                    continue
+                accepted.append((id_input, id_number, role, section))
+            if not accepted:
+                continue
+
+            now = datetime.now()
+            today_date = now.strftime("%Y-%m-%d")
+
+            def _issue(session=None, office=office, accepted=accepted, now=now, today_date=today_date):
+                first = self.counters.reserve_range(office, queue_prefix, today_date, len(accepted), session=session)
+                batch = [{
+                    "idNumber": id_number,
+                    "role": role,
+                    "section": section.upper(),
+                    "queueNumber": f"{queue_prefix}-{first + i:04d}-{section.upper()}",
+                    "seq": first + i,
+                    "priority": priority,
+                    "transaction": "On Queue",
+                    "date": now.strftime("%Y-%m-%d %H:%M:%S"),
+                    "day": today_date,
+                    "created_at": now,
+                    "updated_at": datetime.utcnow(),  # Watermark for the stats aggregator
+                    **({"active": True} if id_number else {})
+                } for i, (_, id_number, role, section) in enumerate(accepted)]
+                self.db[office].insert_many(batch, session=session)
+                return batch
+
+            id_numbers = [id_number for _, id_number, _, _ in accepted]
+            try:
+                ensure_summary(self.db, office, today_date)
+                batch = run_atomic(_issue, self.client)
+                record_issued(self.db, office, today_date, len(batch))
+                active_ids.add_many(office, id_numbers)
+            except errors.BulkWriteError as e:
+                # Another worker queued one of these IDs meanwhile; the transaction left none of the batch behind
+                logging.warning(f"Rejected bulk batch for {office}: {e.details.get('writeErrors', [])[:1]}")
+                rejected += [{"id_input": id_input, "office": office,
+                              "error": "Duplicate request. You have already queued today."}
+                             for id_input, _, _, _ in accepted]
+                continue
+            finally:
+                active_ids.release_many(office, id_numbers)
+
+            # The batch is contiguous at the back of its priority class, so one rank count places all of it
+            first_position, _ = self.calculate_estimated_wait_time(batch[0]["queueNumber"], office, batch[0])
+            for i, ticket in enumerate(batch):
+                position = first_position + i if first_position else None
+                tickets.append({
+                    "office": office,
+                    "id_number": ticket["idNumber"],
+                    "queue_number": ticket["queueNumber"],
+                    "position": position,
+                    "estimated_wait_time": f"{(position - 1) * 1.5} minutes" if position else "N/A"
+                })
+
+            today_date = batch[0]["day"]
+            department = office.removesuffix("QueueRecords")
+            if not print_spooler.submit(b''.join(
+                    build_ticket(department, ticket["queueNumber"], today_date) for ticket in batch)):
+                logging.error(f"Bulk tickets for {department} not printed: print queue is full.")
+
+        logging.info(f"Generated {len(tickets)} queue numbers in bulk, {len(rejected)} rejected")
+
+        return {
+            "message": f"{len(tickets)} queue numbers assigned.",
+            "tickets": tickets,
+            "rejected": rejected
+        }
+
     # Dito yung printer
 
     def print_ticket(self, office, queue_number, today_date):
-        """ Prints the queue ticket via USB thermal printer with formatting & logo """
+        """ Hands the formatted ticket to the print spooler; the USB write happens off the request thread """
 
         department = office.removesuffix("QueueRecords")
+        if not print_spooler.submit(build_ticket(department, queue_number, today_date)):
+            print("❌ Printing error: print queue is full.")
 
-        try:
-            dev = usb.core.find(idVendor=0x0FE6, idProduct=0x811E)
-            if dev is None:
-                print("❌ Printer not detected.")
-                return
-
-            dev.set_configuration()
+request_console = RequestConsole()
+idempotency_store = IdempotencyStore(
+    request_console.db[IDEMPOTENCY_CONFIG["collection_name"]] if IDEMPOTENCY_CONFIG["mongo_backed"] else None
+)
 
-            # Claim the interface before using it
-            cfg = dev.get_active_configuration()
-            intf = cfg[(0, 0)]
-            usb.util.claim_interface(dev, intf.bInterfaceNumber)
 
-            # Get OUT endpoint
-            ep_out = usb.util.find_descriptor(
-                intf,
-                custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_OUT,
-            )
+@request_bp.route('/request_queue', methods=['POST'])
+def request_queue():
+    data = request.json
+    id_input = data.get("id_input")
+    office = data.get("office")
+    priority = data.get("priority", False)
 
-            if ep_out:
-                # ✅ ESC/POS COMMANDS for better formatting
-                esc_reset = b'\x1b\x40'  # ESC @ (Reset printer)
-                esc_center = b'\x1b\x61\x01'  # Center align
-                esc_double_height = b'\x1b\x21\x10'  # Double height text
-                esc_double_width = b'\x1b\x21\x20'  # Double width text
-                esc_cut = b'\x1d\x56\x00'  # Cut paper
+    if not id_input or not office:
+        return jsonify({"error": "Missing required fields."}), 400
 
-                esc_logo = b'\x1d\x2f\x00'  # Print logo if supported (Replace with actual image command)
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if not idempotency_key:
+        return jsonify(request_console.request_queue(id_input, office, priority))
 
-                # 🖨 PRINT TICKET DESIGN
-                ep_out.write(esc_reset)
-                ep_out.write(esc_center + esc_logo)  # Print Logo Placeholder
-                ep_out.write(b'\n')
+    # Kiosk retries reuse the key with the same body, so they get the first answer instead of a second ticket
+    response, status = idempotency_store.run(
+        idempotency_key, data, lambda: (request_console.request_queue(id_input, office, priority), 200)
+    )
+    return jsonify(response), status
 
-                ep_out.write(esc_center + esc_double_height)
-                ep_out.write(f"{department.upper()}\n".encode('utf-8'))  # Centered Office Name
-                ep_out.write(b'\n')
 
-                ep_out.write(esc_center + esc_double_width)
-                ep_out.write(f"QUEUE NUMBER\n".encode('utf-8'))
-                ep_out.write(esc_double_height + f"{queue_number}\n".encode('utf-8'))  # Large Queue Number
-                ep_out.write(b'\n')
 
-                ep_out.write(esc_center)
-                ep_out.write(f"Date: {today_date}\n".encode('utf-8'))  # Print Date
-                ep_out.write(b'\n')
+@request_bp.route('/request_queue/bulk', methods=['POST'])
+def request_queue_bulk():
+    data = request.json
+    id_inputs = data.get("id_inputs")
+    offices = data.get("offices")
+    priority = data.get("priority", False)
 
-                ep_out.write(esc_center)
-                ep_out.write(b"Please wait for your turn.\n")  # Add a message
-                ep_out.write(b'\n\n')
+    if 'username' not in session or session.get('role') not in CONFIG["bulk_roles"]:
+        return jsonify({"error": "Unauthorized"}), 403
 
-                ep_out.write(esc_cut)  # Cut paper
-                print("✅ Printed queue ticket successfully!")
+    if not id_inputs or not offices or not isinstance(id_inputs, list) or not isinstance(offices, list):
+        return jsonify({"error": "Missing required fields."}), 400
 
-            usb.util.release_interface(dev, intf.bInterfaceNumber)
-            usb.util.dispose_resources(dev)  # Free resources to avoid conflicts
+    if len(id_inputs) * len(offices) > CONFIG["bulk_max_tickets"]:
+        return jsonify({"error": f"A bulk request may create at most {CONFIG['bulk_max_tickets']} tickets."}), 400
 
-        except Exception as e:
-            print("❌ Printing error:", e)
+    response = request_console.request_queue_bulk(id_inputs, offices, priority)
+    return jsonify(response)
 
-request_console = RequestConsole()
 
+@request_bp.route('/position/<queue_number>', methods=['GET'])
+def queue_position(queue_number):
+    office = request.args.get("office")
+    if not office:
+        return jsonify({"error": "Missing required fields."}), 400
 
-@request_bp.route('/request_queue', methods=['POST'])
-def request_queue():
-    data = request.json
-    id_input = data.get("id_input")
-    office = data.get("office")
-    priority = data.get("priority", False)
+    if office not in CONFIG["queue_collections"]:
+        return jsonify({"error": "Invalid office selection."}), 400
 
-    if not id_input or not office:
-        return jsonify({"error": "Missing required fields."}), 400
+    position, estimated_time = request_console.calculate_estimated_wait_time(queue_number, office)
+    if position is None:
+        return jsonify({"error": f"Queue number {queue_number} is not waiting."}), 404
 
-    response = request_console.request_queue(id_input, office, priority)
-    return jsonify(response)
+    return jsonify({
+        "queue_number": queue_number,
+        "position": position,
+        "estimated_wait_time": estimated_time
+    })
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+from pymongo import ReturnDocument, errors
+
+from controllers.Shared.database import get_db
+
+CONFIG = {
+    "versions_collection": "QueueVersions",
+    "refresh_interval": 1.0  # Seconds between checks of another worker's changes
+}
+
+# Tickets in these states no longer block the same ID from queueing again
+INACTIVE_STATES = ["Cut Off/Cancelled", "Completed"]
+
+
+class _DayEntry:
+    def __init__(self, version, ids):
+        self.version = version
+        self.ids = ids
+        self.checked = time.monotonic()
+
+
+class ActiveIdIndex:
+    """
+    Per-office, per-day set of idNumbers holding an active ticket.
+    Every change bumps a version stamp in QueueVersions; a worker reloads its set when the stamp
+    moved without it, checking at most once per refresh interval. The lock only guards the in-memory
+    sets: Mongo is always read and written outside it. Issuance claims an ID with reserve() before
+    inserting, so two requests in this process cannot both pass the check; across workers the
+    one_active_id unique index is the guard.
+    """
+
+    def __init__(self, db, refresh_interval=CONFIG["refresh_interval"]):
+        self.db = db
+        self.versions = db[CONFIG["versions_collection"]]
+        self.refresh_interval = refresh_interval
+        self._entries = {}  # (office, day) -> _DayEntry
+        self._reserved = {}  # (office, day) -> IDs whose ticket is being inserted by this process
+        self._loads = {}  # (office, day) -> replay lists of the reloads in flight
+        self._lock = threading.Lock()
+
+    def _today(self):
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _read_version(self, office, day):
+        doc = self.versions.find_one({"_id": f"{office}:{day}"})
+        return doc["version"] if doc else 0
+
+    def _reload(self, office, day):
+        """ Reads the set from Mongo; changes this process makes while it runs are replayed onto the result. """
+        key = (office, day)
+        replay = []
+        with self._lock:
+            self._loads.setdefault(key, []).append(replay)
+        entry = None
+        try:
+            # Read the stamp first: a change landing between the two reads only causes one extra reload
+            version = self._read_version(office, day)
+            entry = _DayEntry(version, {doc["idNumber"] for doc in self.db[office].find({
+                "idNumber": {"$ne": None},
+                "day": day,
+                "transaction": {"$nin": INACTIVE_STATES}
+            }, {"idNumber": 1, "_id": 0})})
+        finally:
+            with self._lock:
+                loads = [other for other in self._loads[key] if other is not replay]
+                if loads:
+                    self._loads[key] = loads
+                else:
+                    del self._loads[key]
+                if entry is not None:
+                    for change in replay:
+                        change(entry.ids)
+                    # Drop other days' sets as the date rolls over
+                    self._entries = {k: v for k, v in self._entries.items() if k[1] == day}
+                    self._entries[key] = entry
+        logging.info(f"Loaded {len(entry.ids)} active IDs for {office} on {day} (version {version}).")
+        return entry
+
+    def _entry(self, office, day):
+        with self._lock:
+            entry = self._entries.get((office, day))
+            if entry is not None and entry.version is not None \
+                    and time.monotonic() - entry.checked < self.refresh_interval:
+                return entry
+        if entry is not None and entry.version is not None and self._read_version(office, day) == entry.version:
+            entry.checked = time.monotonic()
+            return entry
+        return self._reload(office, day)
+
+    def _bump(self, office, day):
+        return self.versions.find_one_and_update(
+            {"_id": f"{office}:{day}"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )["version"]
+
+    def _apply(self, office, change, released=()):
+        day = self._today()
+        key = (office, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                change(entry.ids)
+            for replay in self._loads.get(key, ()):
+                replay.append(change)
+            if key in self._reserved:
+                self._reserved[key] = self._reserved[key].difference(released)
+        try:
+            version = self._bump(office, day)
+        except errors.PyMongoError as e:
+            logging.error(f"Failed to publish active ID change for {office}: {e}")
+            with self._lock:
+                self._entries.pop(key, None)
+            return
+        with self._lock:
+            # Anything other than our own +1 means another worker changed the set too
+            if entry is not None and self._entries.get(key) is entry and entry.version is not None:
+                entry.version = version if entry.version == version - 1 else None
+
+    def reserve(self, office, id_number):
+        """
+        Claims id_number for a ticket about to be inserted. False when it already holds an active ticket
+        or another request in this process is issuing one. Follow with add() on success; release() always.
+        """
+        if not id_number:
+            return True  # Guests carry no ID and never conflict
+        day = self._today()
+        entry = self._entry(office, day)
+        with self._lock:
+            entry = self._entries.get((office, day), entry)
+            reserved = self._reserved.get((office, day), set())
+            if id_number in entry.ids or id_number in reserved:
+                return False
+            self._reserved[(office, day)] = reserved | {id_number}
+            return True
+
+    def release(self, office, id_number):
+        """ Drops a reservation; a no-op once add() has made the ID a member of the set. """
+        self.release_many(office, [id_number])
+
+    def release_many(self, office, id_numbers):
+        key = (office, self._today())
+        with self._lock:
+            reserved = self._reserved.get(key, set()).difference(id_numbers)
+            if reserved:
+                self._reserved[key] = reserved
+            else:
+                self._reserved.pop(key, None)
+
+    def add(self, office, id_number):
+        if id_number:
+            self._apply(office, lambda ids: ids.add(id_number), released=[id_number])
+
+    def add_many(self, office, id_numbers):
+        id_numbers = [id_number for id_number in id_numbers if id_number]
+        if id_numbers:
+            self._apply(office, lambda ids: ids.update(id_numbers), released=id_numbers)
+
+    def discard(self, office, id_number):
+        if id_number:
+            self._apply(office, lambda ids: ids.discard(id_number))
+
+    def invalidate(self, office):
+        """ For bulk updates: every worker, this one included, reloads the office's set on next use. """
+        self._apply(office, lambda ids: None)
+        with self._lock:
+            entry = self._entries.get((office, self._today()))
+            if entry is not None:
+                entry.version = None
+
+
+active_ids = ActiveIdIndex(get_db())
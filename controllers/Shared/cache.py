@@ -0,0 +1,45 @@
+import threading
+import time
+
+
+class SingleFlightCache:
+    """
+    Keeps each key's value for ttl seconds. When it expires, one caller reloads it while
+    concurrent callers for the same key wait for that load instead of repeating it. Passing
+    fresh_after (a time.monotonic() stamp) also rejects a value whose load started before it.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._values = {}  # key -> (expires_at, loaded_at, value)
+        self._locks = {}  # key -> threading.Lock
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _fresh(entry, fresh_after):
+        return entry is not None and entry[0] > time.monotonic() and (fresh_after is None or entry[1] >= fresh_after)
+
+    def get(self, key, loader, fresh_after=None):
+        entry = self._values.get(key)
+        if self._fresh(entry, fresh_after):
+            return entry[2]
+
+        with self._lock_for(key):
+            # Another caller may have finished the load while we waited for the lock
+            entry = self._values.get(key)
+            if self._fresh(entry, fresh_after):
+                return entry[2]
+            loaded_at = time.monotonic()
+            value = loader()
+            self._values[key] = (time.monotonic() + self.ttl, loaded_at, value)
+            return value
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
@@ -0,0 +1,50 @@
+import threading
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """ Wall-clock time (UTC, like the stored hold timestamps) and real sleeping. """
+
+    def now(self):
+        return datetime.utcnow()
+
+    def local_now(self):
+        """ Local time, the basis of the cut-off and of the day field issuance stamps on tickets. """
+        return datetime.now()
+
+    def wait(self, event, seconds):
+        """ Sleeps for seconds or until event is set; returns True when woken by the event. """
+        return event.wait(max(0.0, seconds))
+
+
+class ManualClock:
+    """
+    Test clock: time moves only through advance(), so a scheduler thread waiting on it fires exactly
+    when the test moves past its deadline, without real sleeps. start is UTC; utc_offset sets the
+    local zone local_now() reports in.
+    """
+
+    def __init__(self, start=None, utc_offset=timedelta(0)):
+        self._now = start or datetime(2025, 1, 1, 8, 0)
+        self.utc_offset = utc_offset
+        self._changed = threading.Condition()
+
+    def now(self):
+        with self._changed:
+            return self._now
+
+    def local_now(self):
+        return self.now() + self.utc_offset
+
+    def advance(self, seconds):
+        with self._changed:
+            self._now += timedelta(seconds=seconds)
+            self._changed.notify_all()
+
+    def wait(self, event, seconds):
+        with self._changed:
+            deadline = self._now + timedelta(seconds=max(0.0, seconds))
+            # Short real timeouts only to notice the event, which has no link to the condition
+            while self._now < deadline and not event.is_set():
+                self._changed.wait(0.01)
+            return event.is_set()
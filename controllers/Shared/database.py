@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, errors, monitoring
+
+load_dotenv()
+
+# One client per process; every module gets its handle from get_db()
+DB_CONFIG = {
+    "uri": os.getenv("MONGO_URI") or "mongodb://localhost:27017/",
+    "db_name": os.getenv("MONGO_DB_NAME", "QueueSystem"),
+    "max_pool_size": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+    "min_pool_size": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    "server_selection_timeout_ms": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connect_timeout_ms": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "socket_timeout_ms": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+    "wait_queue_timeout_ms": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "write_concern": os.getenv("MONGO_WRITE_CONCERN", "1"),  # "1", "majority", ...
+    "read_concern": os.getenv("MONGO_READ_CONCERN", "local")
+}
+
+
+class CommandStats(monitoring.CommandListener):
+    """ Counts commands and their latency per collection and command name. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (connection, request_id) -> (collection, command)
+        self._stats = {}  # (collection, command) -> {"count", "failures", "total_ms", "max_ms"}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finish(self, event, failed):
+        with self._lock:
+            key = self._pending.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+            entry = self._stats.setdefault(key, {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0})
+            elapsed_ms = event.duration_micros / 1000
+            entry["count"] += 1
+            entry["failures"] += failed
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+    def snapshot(self):
+        """ Per-collection counters, busiest first. """
+        with self._lock:
+            rows = [{
+                "collection": collection,
+                "command": command,
+                "count": entry["count"],
+                "failures": entry["failures"],
+                "avg_ms": round(entry["total_ms"] / entry["count"], 3),
+                "max_ms": round(entry["max_ms"], 3)
+            } for (collection, command), entry in self._stats.items()]
+        return sorted(rows, key=lambda row: row["count"], reverse=True)
+
+
+command_stats = CommandStats()
+_client = None
+_client_lock = threading.Lock()
+_transactions = {}  # client -> bool
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                write_concern = DB_CONFIG["write_concern"]
+                try:
+                    _client = MongoClient(
+                        DB_CONFIG["uri"],
+                        maxPoolSize=DB_CONFIG["max_pool_size"],
+                        minPoolSize=DB_CONFIG["min_pool_size"],
+                        serverSelectionTimeoutMS=DB_CONFIG["server_selection_timeout_ms"],
+                        connectTimeoutMS=DB_CONFIG["connect_timeout_ms"],
+                        socketTimeoutMS=DB_CONFIG["socket_timeout_ms"],
+                        waitQueueTimeoutMS=DB_CONFIG["wait_queue_timeout_ms"],
+                        w=int(write_concern) if write_concern.isdigit() else write_concern,
+                        readConcernLevel=DB_CONFIG["read_concern"],
+                        event_listeners=[command_stats]
+                    )
+                except errors.ConnectionFailure as e:
+                    logging.error(f"Failed to connect to MongoDB: {e}")
+                    raise RuntimeError("Database connection failed.")
+    return _client
+
+
+def get_db(name=None):
+    return get_client()[name or DB_CONFIG["db_name"]]
+
+
+def supports_transactions(client=None):
+    """ Multi-document transactions need a replica set or a mongos router. """
+    client = client or get_client()
+    if client not in _transactions:
+        try:
+            hello = client.admin.command("hello")
+        except errors.PyMongoError as e:
+            logging.warning(f"Could not detect transaction support: {e}")
+            return False
+        _transactions[client] = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+    return _transactions[client]
+
+
+def run_atomic(callback, client=None):
+    """ Runs callback(session) in a transaction when the server supports one, else callback(). """
+    client = client or get_client()
+    if not supports_transactions(client):
+        return callback()
+    with client.start_session() as session:
+        return session.with_transaction(callback)
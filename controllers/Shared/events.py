@@ -0,0 +1,146 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+from pymongo import errors
+
+from controllers.Shared.database import get_db, supports_transactions
+from controllers.Shared.summary import COUNTER_FIELDS, SUMMARY_COLLECTION, add_change_listener, summary_id
+
+EVENTS_CONFIG = {
+    "poll_interval": 2.0,  # Seconds between summary reads when change streams are unavailable
+    "debounce": 0.05,  # Lets a local transaction commit before its change is read back
+    "subscriber_buffer": 100  # Deltas kept for a slow client before it is resynced with the full counts
+}
+
+
+def sse_message(event, data, event_id=None):
+    """ One server-sent event frame carrying data as JSON; event_id comes back as Last-Event-ID on reconnect. """
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{frame}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class QueueEventHub:
+    """
+    Fans daily-summary changes out to event streams (staff consoles, lobby displays). One watcher thread
+    per process follows the summary documents (a change stream on a replica set, otherwise one point read
+    per poll_interval, woken early by transitions made in this process) and runs only while someone is
+    subscribed.
+    """
+
+    def __init__(self, db, poll_interval=EVENTS_CONFIG["poll_interval"]):
+        self.db = db
+        self.poll_interval = poll_interval
+        self._subscribers = {}  # (office, day) -> set of queue.Queue
+        self._last = {}  # (office, day) -> counts last published
+        self._changed_at = {}  # (office, day) -> time.monotonic() of the last published change
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, office, day):
+        subscription = queue.Queue(maxsize=EVENTS_CONFIG["subscriber_buffer"])
+        with self._lock:
+            self._subscribers.setdefault((office, day), set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name="queue-events", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, office, day, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get((office, day))
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[(office, day)]
+                self._last.pop((office, day), None)
+                self._changed_at.pop((office, day), None)
+
+    def notify(self, office, day):
+        """ Change listener for summary counters; wakes the watcher if anyone follows this office. """
+        if (office, day) in self._subscribers:
+            self._wake.set()
+
+    def changed_at(self, office, day):
+        """ When the watcher last saw this office's counts move, or None while nobody follows it. """
+        return self._changed_at.get((office, day))
+
+    def _keys(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def _publish(self, office, day, counts):
+        key = (office, day)
+        with self._lock:
+            subscriptions = list(self._subscribers.get(key, ()))
+            if not subscriptions:
+                return
+            previous = self._last.get(key, {})
+            delta = {field: value for field, value in counts.items() if previous.get(field) != value}
+            if not delta:
+                return
+            self._last[key] = counts
+            self._changed_at[key] = time.monotonic()
+
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(delta)
+            except queue.Full:
+                # The client fell behind; replace its backlog with the complete state
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(dict(counts))
+
+    def _publish_document(self, doc):
+        self._publish(doc["office"], doc["day"], {field: doc.get(field, 0) for field in COUNTER_FIELDS})
+
+    def _refresh(self):
+        keys = self._keys()
+        if not keys:
+            return
+        ids = [summary_id(office, day) for office, day in keys]
+        for doc in self.db[SUMMARY_COLLECTION].find({"_id": {"$in": ids}}):
+            self._publish_document(doc)
+
+    def _follow_stream(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        with self.db[SUMMARY_COLLECTION].watch(pipeline, full_document="updateLookup",
+                                               max_await_time_ms=int(self.poll_interval * 1000)) as stream:
+            # Catch up with anything that changed before the stream opened
+            self._refresh()
+            while self._keys():
+                change = stream.try_next()
+                if change and change.get("fullDocument"):
+                    self._publish_document(change["fullDocument"])
+
+    def _poll(self):
+        while self._keys():
+            self._refresh()
+            if self._wake.wait(self.poll_interval):
+                self._wake.clear()
+                time.sleep(EVENTS_CONFIG["debounce"])
+
+    def _watch(self):
+        while True:
+            try:
+                # Change streams need the same replica set or mongos that transactions do
+                if supports_transactions(self.db.client):
+                    self._follow_stream()
+                else:
+                    self._poll()
+            except errors.PyMongoError as e:
+                logging.warning(f"Queue event watcher failed, retrying: {e}")
+                time.sleep(self.poll_interval)
+
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+
+queue_events = QueueEventHub(get_db())
+add_change_listener(queue_events.notify)
@@ -0,0 +1,161 @@
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, errors
+
+QUEUE_COLLECTIONS = ["CashierQueueRecords", "MarketingQueueRecords", "BusinessOfficeQueueRecords",
+                     "CSDLQueueRecords", "RegistrarQueueRecords"]
+STATS_COLLECTIONS = ["CashierQueueStats"]
+LEDGER_COLLECTIONS = ["CashierQueueStatsLedger"]
+
+# Serving order: priority tickets first, then issue time. seq comes from separate P and S counters, so it
+# only breaks ties between tickets issued together (a bulk batch shares one created_at).
+QUEUE_ORDER = [("priority", DESCENDING), ("created_at", ASCENDING), ("seq", ASCENDING)]
+
+# Index declarations, created idempotently at startup
+QUEUE_INDEXES = [
+    # Status counts, next-ticket dispatch, rank counts and section updates
+    IndexModel([("day", ASCENDING), ("transaction", ASCENDING)] + QUEUE_ORDER, name="day_queue_order"),
+    # Position lookups by queue number
+    IndexModel([("day", ASCENDING), ("queueNumber", ASCENDING)], name="day_queue_number"),
+    # A clerk's In Process ticket and the per-clerk admin counts
+    IndexModel([("day", ASCENDING), ("reserved_by", ASCENDING), ("transaction", ASCENDING)], name="day_clerk"),
+    # Hold expiry
+    IndexModel([("transaction", ASCENDING), ("hold_timestamp", ASCENDING)], name="hold_expiry"),
+    # Stats aggregator watermark
+    IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at"),
+    # One active ticket per ID and day: issuance sets active on tickets with an idNumber, completion and
+    # cancellation unset it, so two concurrent issuances cannot both insert
+    IndexModel([("day", ASCENDING), ("idNumber", ASCENDING)], name="one_active_id", unique=True,
+               partialFilterExpression={"active": True}),
+]
+COUNTER_INDEXES = [
+    IndexModel([("type", ASCENDING), ("date", ASCENDING), ("queue_type", ASCENDING)], name="counter_key", unique=True),
+]
+# Superseded indexes, dropped when found
+OBSOLETE_QUEUE_INDEXES = ["queue_rank", "day_queue_rank", "day_queue_seq"]
+STATS_INDEXES = [
+    IndexModel([("_id.date", ASCENDING)], name="stats_date"),
+]
+LEDGER_INDEXES = [
+    # Rebuilding one day and pruning past the retention window
+    IndexModel([("date", ASCENDING)], name="ledger_date"),
+]
+
+# Plan stages that mean an index (or _id) lookup rather than a collection scan
+INDEXED_STAGES = {"IXSCAN", "COUNT_SCAN", "IDHACK", "EXPRESS_IXSCAN", "EXPRESS_IDHACK", "DISTINCT_SCAN"}
+
+
+def index_plan():
+    """ (collection name, [IndexModel]) for every collection the queue system reads on a hot path. """
+    plan = []
+    for office in QUEUE_COLLECTIONS:
+        plan.append((office, QUEUE_INDEXES))
+        plan.append((f"{office}Counter", COUNTER_INDEXES))
+    for name in STATS_COLLECTIONS:
+        plan.append((name, STATS_INDEXES))
+    for name in LEDGER_COLLECTIONS:
+        plan.append((name, LEDGER_INDEXES))
+    return plan
+
+
+def ensure_indexes(db):
+    """
+    Creates any missing index; existing ones with the same spec are left alone. Runs at app import, so it
+    never raises: with MongoDB unreachable it logs and returns False, and the app still starts.
+    """
+    try:
+        for name, models in index_plan():
+            try:
+                db[name].create_indexes(models)
+            except errors.OperationFailure as e:
+                logging.error(f"Could not create indexes on {name}: {e}")
+
+        for office in QUEUE_COLLECTIONS:
+            existing = db[office].index_information()
+            for index_name in OBSOLETE_QUEUE_INDEXES:
+                if index_name in existing:
+                    db[office].drop_index(index_name)
+                    logging.info(f"Dropped superseded index {index_name} on {office}.")
+    except errors.PyMongoError as e:
+        # Connection failures land here once instead of once per collection
+        logging.error(f"Index provisioning skipped: {e}")
+        return False
+    logging.info("Index provisioning finished.")
+    return True
+
+
+def hot_queries(today=None):
+    """ (collection, label, explain command) for every query on a request or polling path. """
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    hold_cutoff = datetime.utcnow() - timedelta(minutes=30)
+    issued = datetime.now()
+    order = dict(QUEUE_ORDER)
+    queries = []
+    for office in QUEUE_COLLECTIONS:
+        queries += [
+            (office, "next ticket", {"findAndModify": office,
+                                     "query": {"transaction": "On Queue", "reserved_by": None, "day": today},
+                                     "sort": order,
+                                     "update": {"$set": {"transaction": "In Process"}}}),
+            (office, "clerk ticket", {"findAndModify": office,
+                                      "query": {"transaction": "In Process", "reserved_by": "clerk", "day": today},
+                                      "update": {"$set": {"transaction": "Completed"}}}),
+            (office, "status count", {"count": office, "query": {"transaction": "On Queue", "day": today}}),
+            (office, "rank count", {"count": office, "query": {
+                "transaction": "On Queue", "day": today,
+                "$or": [{"priority": False, "created_at": {"$lt": issued}},
+                        {"priority": False, "created_at": issued, "seq": {"$lt": 100}}, {"priority": True}]}}),
+            (office, "position lookup", {"find": office, "filter": {
+                "transaction": "On Queue", "day": today, "queueNumber": "S-0001-MAIN"}, "limit": 1}),
+            (office, "waiting list", {"find": office, "filter": {"transaction": "On Queue", "day": today},
+                                      "sort": order}),
+            (office, "clerk counts", {"count": office, "query": {
+                "transaction": "Completed", "reserved_by": "clerk", "day": today}}),
+            (office, "oldest hold", {"find": office,
+                                     "filter": {"transaction": "On Hold", "day": today, "hold_timestamp": {"$ne": None}},
+                                     "sort": {"hold_timestamp": 1}, "limit": 1}),
+            (office, "expired holds", {"update": office, "updates": [{
+                "q": {"transaction": "On Hold", "hold_timestamp": {"$lte": hold_cutoff}, "day": today},
+                "u": {"$set": {"transaction": "Cut Off/Cancelled"}}, "multi": True}]}),
+            (office, "section", {"update": office, "updates": [{
+                "q": {"transaction": "On Queue", "section": "MAIN", "day": today},
+                "u": {"$set": {"priority": True}}, "multi": True}]}),
+            (office, "active ids", {"find": office, "filter": {
+                "idNumber": {"$ne": None}, "day": today,
+                "transaction": {"$nin": ["Cut Off/Cancelled", "Completed"]}}}),
+            (f"{office}Counter", "counter", {"findAndModify": f"{office}Counter",
+                                            "query": {"type": "queue_reset", "date": today, "queue_type": "S"},
+                                            "update": {"$inc": {"last_counter": 1}}}),
+        ]
+    for name in STATS_COLLECTIONS:
+        queries.append((name, "stats day", {"find": name, "filter": {"_id.date": today}}))
+    for name in LEDGER_COLLECTIONS:
+        queries.append((name, "ledger day", {"delete": name, "deletes": [{"q": {"date": today}, "limit": 0}]}))
+        queries.append((name, "ledger prune", {"delete": name,
+                                               "deletes": [{"q": {"date": {"$lt": today}}, "limit": 0}]}))
+    queries.append(("CashierQueueRecords", "stats watermark", {
+        "find": "CashierQueueRecords", "filter": {"updated_at": {"$gte": datetime.utcnow() - timedelta(seconds=30)}},
+        "sort": {"updated_at": 1, "_id": 1}, "limit": 1000}))
+    return queries
+
+
+def plan_stages(plan):
+    """ Every stage name in an explain() plan tree. """
+    stages = [plan.get("stage")]
+    for child in [plan.get("inputStage"), plan.get("queryPlan")] + plan.get("inputStages", []):
+        if child:
+            stages += plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+def audit_queries(db, today=None):
+    """ Explains every hot query; returns (collection, label, stages, ok) per query. """
+    results = []
+    for name, label, command in hot_queries(today):
+        explain = db.command("explain", command, verbosity="queryPlanner")
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        # EOF means the collection does not exist yet, so nothing is scanned
+        ok = "COLLSCAN" not in stages and (bool(INDEXED_STAGES.intersection(stages)) or stages == ["EOF"])
+        results.append((name, label, stages, ok))
+    return results
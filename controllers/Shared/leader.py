@@ -0,0 +1,142 @@
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument, errors
+
+LEADER_CONFIG = {
+    "collection_name": "Leases",
+    "ttl": int(os.getenv("LEADER_LEASE_TTL", "30")),  # Seconds a silent leader keeps the lease
+    "heartbeat": int(os.getenv("LEADER_HEARTBEAT", "10"))  # Seconds between renewals / takeover attempts
+}
+
+
+class JobStats:
+    """ Run counts and durations per background job, in the same shape as CommandStats. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}  # job -> {"count", "failures", "total_ms", "max_ms", "last_ms", "last_run"}
+
+    def record(self, job, elapsed_ms, failed=False):
+        with self._lock:
+            entry = self._stats.setdefault(job, {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["failures"] += failed
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_ms"] = elapsed_ms
+            entry["last_run"] = datetime.utcnow()
+
+    def snapshot(self):
+        with self._lock:
+            return [{
+                "job": job,
+                "count": entry["count"],
+                "failures": entry["failures"],
+                "avg_ms": round(entry["total_ms"] / entry["count"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "last_ms": round(entry["last_ms"], 3),
+                "last_run": entry["last_run"].isoformat()
+            } for job, entry in sorted(self._stats.items())]
+
+
+class LeaderLease:
+    """
+    One named lease per deployment, held in a Mongo document that the holder renews every heartbeat.
+    Other workers stay passive and take the lease over once it has gone ttl seconds without renewal.
+    """
+
+    def __init__(self, db, name, ttl=LEADER_CONFIG["ttl"], heartbeat=LEADER_CONFIG["heartbeat"], stats=None):
+        self.collection = db[LEADER_CONFIG["collection_name"]]
+        self.name = name
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.stats = stats
+        self.leading = threading.Event()
+        self._started = threading.Event()
+
+    @property
+    def worker(self):
+        # Read per call: a lease built before a pre-fork server forks must not share its pid
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def try_acquire(self):
+        """ Takes or renews the lease; True while this worker holds it. """
+        now = datetime.utcnow()
+        update = {
+            "$set": {"holder": self.worker, "expires_at": now + timedelta(seconds=self.ttl), "renewed_at": now}
+        }
+        if self.stats is not None:
+            update["$set"]["jobs"] = self.stats.snapshot()
+        try:
+            lease = self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": self.worker}, {"expires_at": {"$lte": now}}]},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            held = lease["holder"] == self.worker
+        except errors.DuplicateKeyError:
+            held = False  # Another worker holds a live lease
+        except errors.PyMongoError as e:
+            logging.error(f"Lease {self.name} heartbeat failed: {e}")
+            held = False
+
+        if held and not self.leading.is_set():
+            logging.info(f"Worker {self.worker} became leader for {self.name}.")
+            try:
+                self.collection.update_one({"_id": self.name, "holder": self.worker}, {"$set": {"acquired_at": now}})
+            except errors.PyMongoError as e:
+                logging.warning(f"Could not stamp lease {self.name}: {e}")
+            self.leading.set()
+        elif not held and self.leading.is_set():
+            logging.warning(f"Worker {self.worker} lost the {self.name} lease.")
+            self.leading.clear()
+        return held
+
+    def release(self):
+        """ Hands the lease back so a passive worker takes over at its next heartbeat. """
+        if not self.leading.is_set():
+            return
+        self.leading.clear()
+        try:
+            self.collection.delete_one({"_id": self.name, "holder": self.worker})
+        except errors.PyMongoError as e:
+            logging.warning(f"Could not release lease {self.name}: {e}")
+
+    def status(self):
+        """ This worker's view plus the lease document, which carries the leader's job stats. """
+        lease = self.collection.find_one({"_id": self.name}) or {}
+        return {
+            "lease": self.name,
+            "worker": self.worker,
+            "is_leader": self.leading.is_set(),
+            "leader": lease.get("holder"),
+            "acquired_at": lease["acquired_at"].isoformat() if lease.get("acquired_at") else None,
+            "expires_at": lease["expires_at"].isoformat() if lease.get("expires_at") else None,
+            "jobs": lease.get("jobs", [])
+        }
+
+    def start(self):
+        if self._started.is_set():
+            return
+        self._started.set()
+
+        try:
+            # Clears leases whose worker died without releasing them
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+        except errors.PyMongoError as e:
+            logging.warning(f"Could not create lease TTL index: {e}")
+
+        def heartbeat():
+            while True:
+                self.try_acquire()
+                time.sleep(self.heartbeat)
+
+        threading.Thread(target=heartbeat, name=f"lease-{self.name}", daemon=True).start()
+        atexit.register(self.release)
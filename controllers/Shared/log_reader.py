@@ -0,0 +1,142 @@
+import json
+import os
+
+LOG_READER_CONFIG = {
+    "block_size": 64 * 1024,  # Bytes read per backwards seek
+    "max_scan_bytes": 4 * 1024 * 1024,  # Bytes one page may scan looking for filter matches
+    "max_rotated": 50  # Highest .N suffix looked at for rotated files
+}
+
+
+def log_files(path):
+    """ The live log followed by its rotated backups, newest first: path, path.1, path.2, ... """
+    files = [path] if os.path.exists(path) else []
+    for n in range(1, LOG_READER_CONFIG["max_rotated"] + 1):
+        rotated = f"{path}.{n}"
+        if not os.path.exists(rotated):
+            break
+        files.append(rotated)
+    return files
+
+
+def make_cursor(file_path, offset):
+    # The inode survives the rename a rotation does, so a cursor keeps pointing at the same bytes
+    return f"{os.stat(file_path).st_ino}:{offset}"
+
+
+def resolve_cursor(files, cursor):
+    """ (index into files, byte offset) for a cursor, or None when its file has rotated away. """
+    try:
+        inode, offset = (int(part) for part in cursor.split(":"))
+    except (AttributeError, ValueError):
+        return None
+    for index, file_path in enumerate(files):
+        if os.stat(file_path).st_ino == inode:
+            return index, offset
+    return None
+
+
+def read_lines_backwards(file_path, end_offset=None, block_size=None):
+    """ Yields (line start offset, line bytes) from end_offset towards the start of the file. """
+    block_size = block_size or LOG_READER_CONFIG["block_size"]
+    with open(file_path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell() if end_offset is None else min(end_offset, file.tell())
+        remainder = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            file.seek(position)
+            block = file.read(read_size) + remainder
+            lines = block.split(b"\n")
+            # The first piece may continue in the previous block
+            remainder = lines.pop(0)
+            offset = position + len(remainder) + 1
+            found = []
+            for line in lines:
+                found.append((offset, line))
+                offset += len(line) + 1
+            for line_offset, line in reversed(found):
+                if line.strip():
+                    yield line_offset, line
+        if remainder.strip():
+            yield 0, remainder
+
+
+def parse_line(raw):
+    """ A structured record as a dict; the older "time - LEVEL - message" lines are split the same way. """
+    text = raw.decode("utf-8", errors="replace").rstrip("\r")
+    if text.startswith("{"):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    parts = text.split(" - ", 2)
+    if len(parts) == 3:
+        return {"time": parts[0], "level": parts[1], "message": parts[2]}
+    return {"message": text}
+
+
+def matches(record, level=None, office=None, user=None):
+    if level and record.get("level", "").upper() != level.upper():
+        return False
+    # Unstructured lines carry no fields, so office and user fall back to a search of the message
+    if office and office != record.get("office") and office not in record.get("message", ""):
+        return False
+    if user and user != record.get("user") and user not in record.get("message", ""):
+        return False
+    return True
+
+
+def format_record(record):
+    extras = [f"{field}={record[field]}" for field in ("office", "user", "latency_ms") if record.get(field) is not None]
+    line = " - ".join(part for part in (record.get("time"), record.get("level"), record.get("message")) if part)
+    if extras:
+        line += f" [{' '.join(extras)}]"
+    if record.get("exception"):
+        line += f"\n{record['exception']}"
+    return line
+
+
+def read_page(path, cursor=None, limit=50, level=None, office=None, user=None):
+    """
+    Up to limit matching records older than cursor (the newest when cursor is None), in file order, and
+    the cursor for the page before them (None once every file is read). Work per page is bounded by
+    limit and max_scan_bytes, never by the size of the log.
+    """
+    files = log_files(path)
+    if not files:
+        return [], None
+
+    start = (0, None)
+    if cursor:
+        start = resolve_cursor(files, cursor)
+        if start is None:
+            return [], None
+
+    records = []
+    scanned = 0
+    file_index, end_offset = start
+    while file_index < len(files):
+        file_path = files[file_index]
+        for offset, raw in read_lines_backwards(file_path, end_offset):
+            scanned += len(raw) + 1
+            record = parse_line(raw)
+            if matches(record, level, office, user):
+                records.append(record)
+            if len(records) >= limit or scanned >= LOG_READER_CONFIG["max_scan_bytes"]:
+                records.reverse()
+                return records, make_cursor(file_path, offset) if offset > 0 else _next_file_cursor(files, file_index)
+        file_index += 1
+        end_offset = None
+
+    records.reverse()
+    return records, None
+
+
+def _next_file_cursor(files, file_index):
+    """ Cursor for the end of the next older file, or None when there is none. """
+    if file_index + 1 >= len(files):
+        return None
+    older = files[file_index + 1]
+    return make_cursor(older, os.path.getsize(older))
@@ -0,0 +1,174 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from controllers.Shared.log_reader import parse_line, read_lines_backwards
+
+LOG_TAIL_CONFIG = {
+    "poll_interval": 0.5,  # Seconds between size checks of the followed file
+    "buffer_lines": 1000,  # Recent lines kept for new and reconnecting viewers
+    "preload_lines": 200,  # Lines read back from the end when following starts
+    "subscriber_buffer": 1000  # Lines queued for a slow viewer before it is told it missed some
+}
+
+GAP = None  # Queued in place of lines a viewer missed
+
+
+class LogTailer:
+    """
+    Follows one log file like tail -f for any number of viewers. A single thread polls the file size,
+    reads only the new bytes and fans each line out, so viewers never open the file themselves. It
+    follows rotation (the path pointing at a new inode) and truncation, and keeps the last lines with
+    their "<inode>:<end offset>" cursors so a reconnecting viewer resumes where it left off.
+    """
+
+    def __init__(self, path, poll_interval=LOG_TAIL_CONFIG["poll_interval"]):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._buffer = deque(maxlen=LOG_TAIL_CONFIG["buffer_lines"])  # (cursor, record, inode, end offset)
+        self._subscribers = set()
+        self._lock = threading.RLock()  # Held for each poll, so subscribe sees the buffer and position together
+        self._active = threading.Event()  # Set while anyone is watching
+        self._thread = None
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._partial = b""
+
+    def subscribe(self, cursor=None):
+        """
+        Returns (queue, backlog, gap). backlog holds the buffered entries after cursor (all of them when
+        cursor is None); gap is True when the cursor is older than the buffer, so lines were skipped.
+        """
+        subscription = queue.Queue(maxsize=LOG_TAIL_CONFIG["subscriber_buffer"])
+        with self._lock:
+            if not self._active.is_set():
+                self._open_at_end()
+                self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._follow, name="log-tail", daemon=True)
+                self._thread.start()
+            backlog, gap = self._backlog_after(cursor)
+            self._subscribers.add(subscription)
+        return subscription, backlog, gap
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                self._active.clear()
+
+    def _backlog_after(self, cursor):
+        entries = list(self._buffer)
+        if cursor is None:
+            return entries, False
+        try:
+            inode, offset = (int(part) for part in cursor.split(":"))
+        except ValueError:
+            return entries, True
+        if (inode, offset) == (self._inode, self._offset - len(self._partial)):
+            return [], False
+        for index in range(len(entries) - 1, -1, -1):
+            _, _, entry_inode, end = entries[index]
+            if entry_inode == inode and end <= offset:
+                return entries[index + 1:], False
+        return entries, True
+
+    def _open_at_end(self):
+        """ Starts at the end of the file, with its last lines in the buffer for context. """
+        self._buffer.clear()
+        self._close()
+        if not os.path.exists(self.path):
+            return
+        self._file = open(self.path, "rb")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offset = self._file.seek(0, os.SEEK_END)
+        self._partial = b""
+
+        recent = []
+        for start, line in read_lines_backwards(self.path, self._offset):
+            recent.append((start, line))
+            if len(recent) >= LOG_TAIL_CONFIG["preload_lines"]:
+                break
+        for start, line in reversed(recent):
+            end = start + len(line) + 1
+            self._buffer.append((f"{self._inode}:{end}", parse_line(line), self._inode, end))
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_new(self):
+        """ Publishes the complete lines written since the last read. """
+        data = self._file.read()
+        if not data:
+            return
+        start = self._offset - len(self._partial)
+        self._offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()  # The writer may be mid-line
+        entries = []
+        for line in lines:
+            end = start + len(line) + 1
+            if line.strip():
+                entries.append((f"{self._inode}:{end}", parse_line(line), self._inode, end))
+            start = end
+        if entries:
+            self._publish(entries)
+
+    def _publish(self, entries):
+        with self._lock:
+            self._buffer.extend(entries)
+            subscriptions = list(self._subscribers)
+        for subscription in subscriptions:
+            for entry in entries:
+                try:
+                    subscription.put_nowait(entry)
+                except queue.Full:
+                    # The viewer fell behind; drop its backlog and tell it lines were skipped
+                    with subscription.mutex:
+                        subscription.queue.clear()
+                    subscription.put_nowait(GAP)
+                    break
+
+    def _poll(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return  # Mid-rotation; the new file appears shortly
+
+        if self._file is None or stat.st_ino != self._inode:
+            if self._file is not None:
+                # Rotated: finish the old file through the open handle, then start the new one
+                self._read_new()
+                self._close()
+            self._file = open(self.path, "rb")
+            self._inode = os.fstat(self._file.fileno()).st_ino
+            self._offset = 0
+            self._partial = b""
+        elif stat.st_size < self._offset:
+            # Truncated in place
+            self._file.seek(0)
+            self._offset = 0
+            self._partial = b""
+
+        if stat.st_size > self._offset:
+            self._read_new()
+
+    def _follow(self):
+        while True:
+            # Idle with nobody watching: no stat calls, no open file
+            self._active.wait()
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._active.is_set():
+                    self._close()
+                    continue
+                try:
+                    self._poll()
+                except OSError as e:
+                    logging.warning(f"Log tail of {self.path} failed, retrying: {e}")
@@ -0,0 +1,161 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+try:
+    from flask import g, has_request_context, request, session
+except ImportError:  # Scripts and benchmarks that log without Flask installed
+    has_request_context = None
+
+LOG_CONFIG = {
+    "path": os.getenv("LOG_PATH", "logs/queue_system.log"),
+    "admin_path": os.getenv("ADMIN_LOG_PATH", "logs/admin_console.log"),
+    "level": os.getenv("LOG_LEVEL", "INFO"),
+    # Keep one record in N for these high-frequency messages (extra={"sample": key})
+    "sample_rates": {"queue_status": int(os.getenv("LOG_SAMPLE_QUEUE_STATUS", "50"))}
+}
+
+# Attributes every LogRecord has; anything else came in through extra= and is written out as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line: time, level, logger, message, plus office/user/latency_ms and any other extras. """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs on the thread that logs, so it can still read the Flask request: fills in office (the
+    blueprint), user (session username) and latency_ms (time since the request started).
+    """
+
+    def filter(self, record):
+        if has_request_context is None or not has_request_context():
+            return True
+
+        if not hasattr(record, "office") and request.blueprint:
+            record.office = request.blueprint
+        if not hasattr(record, "user"):
+            record.user = session.get("username")
+        started = g.get("log_started")
+        if started is not None and not hasattr(record, "latency_ms"):
+            record.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """ Keeps one record in N for each sampled key; the kept ones carry sample_rate so counts can be scaled. """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        rate = self.rates.get(key, 1)
+        if rate <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record untouched. The stock prepare() formats the message and
+    copies the record on the calling thread; here the listener thread does all formatting.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging():
+    """
+    Routes every logger through a QueueHandler, so request threads only enqueue; one QueueListener
+    thread formats and writes. Safe to call from every module: only the first call sets it up.
+
+    Every worker process appends to the same files, so none of them rotates: that is left to
+    logrotate, and WatchedFileHandler reopens the path once it has been moved. Keep logrotate's
+    numbered backups (queue_system.log.1 is the newest), which is what the log viewer walks:
+
+        /srv/queue-system/logs/*.log {
+            daily
+            maxsize 20M
+            rotate 14
+            nodateext
+            missingok
+            notifempty
+        }
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        for path in (LOG_CONFIG["path"], LOG_CONFIG["admin_path"]):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        formatter = JsonFormatter()
+        main_handler = WatchedFileHandler(LOG_CONFIG["path"], encoding="utf-8", delay=True)
+        main_handler.setFormatter(formatter)
+        admin_handler = WatchedFileHandler(LOG_CONFIG["admin_path"], encoding="utf-8", delay=True)
+        admin_handler.setFormatter(formatter)
+        admin_handler.addFilter(logging.Filter("admin"))  # The admin console log only gets logger "admin"
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        # Filters run on the calling thread: sample before anything is enqueued, read the request while it exists
+        queue_handler.addFilter(SamplingFilter(LOG_CONFIG["sample_rates"]))
+        queue_handler.addFilter(RequestContextFilter())
+
+        root = logging.getLogger()
+        root.setLevel(LOG_CONFIG["level"])
+        root.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, main_handler, admin_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """ Writes out whatever is still queued and stops the listener thread. """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def init_request_timing(app):
+    """ Stamps each request's start so records logged during it carry latency_ms. """
+    @app.before_request
+    def _start_timer():
+        g.log_started = time.perf_counter()
@@ -0,0 +1,110 @@
+import logging
+
+SUMMARY_COLLECTION = "QueueDailySummary"
+
+# Ticket state -> counter field in the {office, day} summary document
+STATE_FIELDS = {
+    "On Queue": "on_queue",
+    "In Process": "in_process",
+    "On Hold": "on_hold",
+    "Completed": "completed",
+    "Cut Off/Cancelled": "cut_off"
+}
+COUNTER_FIELDS = ["issued"] + list(STATE_FIELDS.values())
+
+# Callables run as listener(office, day) after each counter change made by this process
+_change_listeners = []
+# (office, day) whose summary document this process has seen exist
+_seeded = set()
+
+
+def summary_id(office, day):
+    return f"{office}:{day}"
+
+
+def ensure_summary(db, office, day):
+    """
+    Seeds the office's summary document for day from the raw records if it does not exist yet. Call it
+    before the ticket write whose transition is recorded: seeded afterwards, the write would be counted
+    twice (once in the seed, once by its $inc). Costs a set lookup once the document is known to exist.
+    """
+    if (office, day) in _seeded:
+        return
+    if db[SUMMARY_COLLECTION].find_one({"_id": summary_id(office, day)}, {"_id": 1}) is None:
+        counts = count_by_state(db, office, day)
+        # $setOnInsert leaves a document seeded by another worker alone
+        db[SUMMARY_COLLECTION].update_one(
+            {"_id": summary_id(office, day)},
+            {"$setOnInsert": {"office": office, "day": day, **counts}},
+            upsert=True
+        )
+    # Forget other days as the date rolls over
+    _seeded.difference_update([key for key in _seeded if key[1] != day])
+    _seeded.add((office, day))
+
+
+def _increment(db, office, day, changes):
+    # Outside the ticket transaction: every transaction of the office would otherwise write this one
+    # document and conflict. A crash between the commit and this $inc leaves drift; reconcile_summary fixes it.
+    db[SUMMARY_COLLECTION].update_one(
+        {"_id": summary_id(office, day)},
+        {"$inc": changes, "$setOnInsert": {"office": office, "day": day}},
+        upsert=True
+    )
+    for listener in _change_listeners:
+        listener(office, day)
+
+
+def add_change_listener(listener):
+    _change_listeners.append(listener)
+
+
+def record_issued(db, office, day, count=1):
+    """ New tickets enter On Queue. Call ensure_summary before the insert and this after it commits. """
+    if count:
+        _increment(db, office, day, {"issued": count, "on_queue": count})
+
+
+def record_transition(db, office, day, from_state, to_state, count=1):
+    """ Moves count tickets between state counters. Call ensure_summary before the update, this after it commits. """
+    if count:
+        _increment(db, office, day, {STATE_FIELDS[from_state]: -count, STATE_FIELDS[to_state]: count})
+
+
+def count_by_state(db, office, day):
+    """ Rebuilds the counters from the raw ticket records. """
+    counts = dict.fromkeys(COUNTER_FIELDS, 0)
+    for row in db[office].aggregate([
+        {"$match": {"day": day}},
+        {"$group": {"_id": "$transaction", "count": {"$sum": 1}}}
+    ]):
+        counts["issued"] += row["count"]
+        if row["_id"] in STATE_FIELDS:
+            counts[STATE_FIELDS[row["_id"]]] = row["count"]
+    return counts
+
+
+def get_summary(db, office, day):
+    """ Live counts for one office and day: a point lookup, seeded from raw records on first use. """
+    doc = db[SUMMARY_COLLECTION].find_one({"_id": summary_id(office, day)})
+    if doc is None:
+        ensure_summary(db, office, day)
+        doc = db[SUMMARY_COLLECTION].find_one({"_id": summary_id(office, day)}) or {}
+    return {field: doc.get(field, 0) for field in COUNTER_FIELDS}
+
+
+def reconcile_summary(db, office, day, fix=False):
+    """ Compares the stored counters with a rebuild from raw records; returns the differing fields. """
+    stored_doc = db[SUMMARY_COLLECTION].find_one({"_id": summary_id(office, day)}) or {}
+    stored = {field: stored_doc.get(field, 0) for field in COUNTER_FIELDS}
+    rebuilt = count_by_state(db, office, day)
+    diffs = {field: (stored[field], rebuilt[field]) for field in COUNTER_FIELDS if stored[field] != rebuilt[field]}
+
+    if diffs and fix:
+        db[SUMMARY_COLLECTION].update_one(
+            {"_id": summary_id(office, day)},
+            {"$set": {"office": office, "day": day, **rebuilt}},
+            upsert=True
+        )
+        logging.info(f"Rebuilt daily summary for {office} on {day}: {diffs}")
+    return diffs
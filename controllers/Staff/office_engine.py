@@ -0,0 +1,423 @@
+from flask import Blueprint, Response, jsonify, session, stream_with_context
+from datetime import datetime, timedelta
+import threading
+import logging
+import queue
+import time
+from controllers.Shared.active_ids import active_ids
+from controllers.Shared.cache import SingleFlightCache
+from controllers.Shared.clock import SystemClock
+from controllers.Shared.database import get_db, run_atomic
+from controllers.Shared.events import queue_events, sse_message
+from controllers.Shared.indexes import QUEUE_ORDER
+from controllers.Shared.leader import JobStats, LeaderLease
+from controllers.Shared.logger import configure_logging
+from controllers.Shared.summary import add_change_listener, ensure_summary, get_summary, record_transition
+
+# Logging Configuration: shared, non-blocking JSON pipeline
+configure_logging()
+
+# Office Configurations
+CONFIG = {
+    "cut_off_time": "17:00",
+    "hold_expiry_minutes": 30,
+    "scheduler_max_sleep": 600,  # Longest scheduler sleep; must stay below hold_expiry_minutes
+    "status_cache_ttl": 1.0,  # Seconds one summary read for queue_status is shared between clerks
+    "events_heartbeat": 15,  # Seconds of silence before an event stream sends a keep-alive comment
+    "events_retry_ms": 3000  # Browser reconnect delay after a dropped event stream
+}
+
+# Summary counter -> queue_status field pushed to the staff consoles
+STATUS_FIELDS = {"on_queue": "on_queue_count", "on_hold": "on_hold_count", "cut_off": "cut_off_count"}
+
+# Offices served by the staff consoles. Adding a row adds an API without adding threads or connections.
+OFFICES = [
+    {"name": "csdl", "collection_name": "CSDLQueueRecords", "url_prefix": "/csdl_api"},
+    {"name": "cashier", "collection_name": "CashierQueueRecords", "url_prefix": "/cashier_api"},
+    {"name": "marketing", "collection_name": "MarketingQueueRecords", "url_prefix": "/marketing_api"},
+    {"name": "business", "collection_name": "BusinessOfficeQueueRecords", "url_prefix": "/business_api"},
+    {"name": "registrar", "collection_name": "RegistrarQueueRecords", "url_prefix": "/registrar_api"},
+]
+
+# Shared MongoDB connection pool
+db = get_db()
+
+status_cache = SingleFlightCache(CONFIG["status_cache_ttl"])
+
+
+def status_counts(collection_name, today):
+    """ On Queue / On Hold / Cut Off for one office and day: one _id lookup on its summary document, no counting. """
+    summary = get_summary(db, collection_name, today)
+    return {
+        "On Queue": summary["on_queue"],
+        "On Hold": summary["on_hold"],
+        "Cut Off/Cancelled": summary["cut_off"]
+    }
+
+
+def complete_and_claim_next(collection_name, username, today):
+    """
+    Completes the clerk's In Process ticket and claims the next On Queue ticket in one transaction,
+    so a failure cannot complete one without claiming the other. Returns (completed, claimed).
+    """
+    queue_collection = db[collection_name]
+
+    def _advance(session=None):
+        current_queue = queue_collection.find_one_and_update(
+            {"transaction": "In Process", "reserved_by": username, "day": today},
+            {"$set": {"transaction": "Completed", "reserved_by": username}, "$unset": {"active": ""},
+             "$currentDate": {"updated_at": True}},
+            return_document=True,
+            session=session
+        )
+
+        # Fetch the next queue (prioritizing high priority & earliest issued)
+        next_queue = queue_collection.find_one_and_update(
+            {"transaction": "On Queue", "reserved_by": None, "day": today},
+            {"$set": {"transaction": "In Process", "reserved_by": username}, "$currentDate": {"updated_at": True}},
+            sort=QUEUE_ORDER,
+            return_document=True,
+            session=session
+        )
+        return current_queue, next_queue
+
+    ensure_summary(db, collection_name, today)
+    current_queue, next_queue = run_atomic(_advance, db.client)
+    if current_queue:
+        record_transition(db, collection_name, today, "In Process", "Completed")
+        active_ids.discard(collection_name, current_queue.get("idNumber"))
+    if next_queue:
+        record_transition(db, collection_name, today, "On Queue", "In Process")
+    return current_queue, next_queue
+
+
+def create_office_blueprint(office):
+    """ Builds the staff console API for one row of OFFICES. """
+    office_bp = Blueprint(office["name"], __name__)
+    collection_name = office["collection_name"]
+    queue_collection = db[collection_name]
+
+    # Fetch Next Queue
+    @office_bp.route('/get_next_queue', methods=['POST'])
+    def get_next_queue():
+        username = session.get("username")
+        if not username:
+            return jsonify({"error": "User not logged in"}), 403
+
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        logging.info(f"User {username} requested the next queue.")
+
+        # Complete the current queue in process and claim the next one together
+        current_queue, next_queue = complete_and_claim_next(collection_name, username, today)
+
+        if current_queue:
+            logging.info(f"Completed queue: {current_queue['queueNumber']} by {username}")
+
+        if next_queue:
+            logging.info(f"Next queue assigned to {username}: {next_queue['queueNumber']}")
+            return jsonify({
+                "message": f"Next queue reserved: {next_queue['queueNumber']}",
+                "queueNumber": next_queue["queueNumber"],
+                "completedQueueNumber": current_queue["queueNumber"] if current_queue else None
+            })
+
+        logging.info("No available queues to process.")
+        return jsonify({
+            "message": "No available queues to process.",
+            "completedQueueNumber": current_queue["queueNumber"] if current_queue else None
+        })
+
+    # Hold Current Queue
+    @office_bp.route('/hold_queue', methods=['POST'])
+    def hold_queue():
+        username = session.get("username")
+        if not username:
+            return jsonify({"error": "User not logged in"}), 403
+
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        logging.info(f"User {username} requested to hold a queue.")
+
+        ensure_summary(db, collection_name, today)
+        queue = queue_collection.find_one_and_update(
+            {"transaction": "In Process", "reserved_by": username, "day": today},
+            {"$set": {"transaction": "On Hold", "reserved_by": None, "hold_timestamp": datetime.utcnow()},
+             "$currentDate": {"updated_at": True}},
+            return_document=True
+        )
+
+        if queue:
+            record_transition(db, collection_name, today, "In Process", "On Hold")
+            logging.info(f"Queue {queue['queueNumber']} put on hold by {username}.")
+            return jsonify({"message": f"Queue {queue['queueNumber']} put on hold."})
+
+        logging.warning(f"No queues available for {username} to hold.")
+        return jsonify({"message": "No queues available to hold."})
+
+    def console_status(username, today):
+        # Shared by every clerk of the office: at most one summary lookup per status_cache_ttl. Counts cached
+        # before the event hub's last change are reloaded: the hub only sends later deltas, so a stale first
+        # frame on the event stream would never be corrected.
+        counts = status_cache.get((collection_name, today), lambda: status_counts(collection_name, today),
+                                  fresh_after=queue_events.changed_at(collection_name, today))
+
+        in_process_queue = queue_collection.find_one(
+            {"transaction": "In Process", "reserved_by": username, "day": today},
+            sort=QUEUE_ORDER
+        )
+
+        if in_process_queue:
+            in_process_message = f"Queue {in_process_queue['queueNumber']} (ID: {in_process_queue.get('idNumber', 'N/A')})"
+        else:
+            in_process_message = None
+
+        return {
+            "on_queue_count": counts["On Queue"],
+            "on_hold_count": counts["On Hold"],
+            "cut_off_count": counts["Cut Off/Cancelled"],
+            "in_process_queue": in_process_message
+        }
+
+    # Get Queue Status for GUI
+    @office_bp.route('/queue_status', methods=['GET'])
+    def queue_status():
+        username = session.get("username")
+        if not username:
+            return jsonify({"error": "User not logged in"}), 403
+
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        status = console_status(username, today)
+
+        # Polled by every console: one sampled line instead of three per poll
+        logging.info(f"Queue status for {username} on {today}: On Queue: {status['on_queue_count']}, "
+                     f"On Hold: {status['on_hold_count']}, Cut Off: {status['cut_off_count']}",
+                     extra={"sample": "queue_status"})
+
+        return jsonify(status)
+
+    # Push Queue Status changes to the GUI
+    @office_bp.route('/events', methods=['GET'])
+    def events():
+        """
+        Server-sent events: the full status once, then an event carrying only the counts that changed.
+        Nothing is read from the database for this console while its office is quiet.
+        """
+        username = session.get("username")
+        if not username:
+            return jsonify({"error": "User not logged in"}), 403
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        subscription = queue_events.subscribe(collection_name, today)
+
+        def stream():
+            try:
+                # A reconnecting browser gets the full status again, so no Last-Event-ID replay is needed
+                yield f"retry: {CONFIG['events_retry_ms']}\n\n"
+                yield sse_message("status", console_status(username, today))
+                while True:
+                    try:
+                        changes = subscription.get(timeout=CONFIG["events_heartbeat"])
+                    except queue.Empty:
+                        yield ": heartbeat\n\n"
+                        continue
+                    delta = {STATUS_FIELDS[field]: value for field, value in changes.items() if field in STATUS_FIELDS}
+                    if delta:
+                        yield sse_message("status", delta)
+            finally:
+                queue_events.unsubscribe(collection_name, today, subscription)
+
+        return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @office_bp.route('/pause_queue', methods=['POST'])
+    def pause_queue():
+        """
+        Completes the current queue but prevents fetching the next one.
+        """
+        username = session.get("username")
+        if not username:
+            return jsonify({"error": "User not logged in"}), 403
+
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        # Complete the current 'In Process' queue
+        ensure_summary(db, collection_name, today)
+        current_queue = queue_collection.find_one_and_update(
+            {"transaction": "In Process", "reserved_by": username, "day": today},
+            {"$set": {"transaction": "Completed", "reserved_by": username}, "$unset": {"active": ""},
+             "$currentDate": {"updated_at": True}},
+            return_document=True
+        )
+
+        if current_queue:
+            record_transition(db, collection_name, today, "In Process", "Completed")
+            active_ids.discard(collection_name, current_queue.get("idNumber"))
+            logging.info(f"Queue {current_queue['queueNumber']} marked as 'Completed' by {username}.")
+            return jsonify({
+                "message": f"Queue {current_queue['queueNumber']} completed successfully.",
+                "queueNumber": current_queue["queueNumber"]
+            })
+
+        logging.info(f"No active queue for {username} to complete.")
+        return jsonify({"message": "No active queue to complete."})
+
+    return office_bp
+
+
+def cutoff_at(now):
+    """ Today's cut-off as a datetime on the same (local) clock as now. """
+    cutoff_time = datetime.strptime(CONFIG["cut_off_time"], "%H:%M").time()
+    return datetime.combine(now.date(), cutoff_time)
+
+
+def auto_cutoff(collection_name, local_now=None):
+    """ Cancels all 'On Queue' transactions after the cut-off time. """
+    # Local, like the day field issuance stamps: the cut-off and the day it applies to share one clock
+    local_now = local_now or datetime.now()
+    today = local_now.strftime("%Y-%m-%d")
+    if local_now < cutoff_at(local_now):
+        return
+
+    ensure_summary(db, collection_name, today)
+    result = db[collection_name].update_many(
+        {"transaction": "On Queue", "day": today},
+        {"$set": {"transaction": "Cut Off/Cancelled"}, "$unset": {"active": ""},
+         "$currentDate": {"updated_at": True}}
+    )
+    record_transition(db, collection_name, today, "On Queue", "Cut Off/Cancelled", result.modified_count)
+    if result.modified_count:
+        active_ids.invalidate(collection_name)
+        logging.info(f"System automatically canceled {result.modified_count} expired queues in {collection_name}.")
+
+
+def cancel_expired_holds(collection_name, now=None, today=None):
+    """ Cancels queues that have been 'On Hold' for more than 30 minutes. """
+    now = now or datetime.utcnow()
+    expiration_time = now - timedelta(minutes=CONFIG["hold_expiry_minutes"])
+    today = today or datetime.now().strftime("%Y-%m-%d")
+
+    ensure_summary(db, collection_name, today)
+    result = db[collection_name].update_many(
+        {"transaction": "On Hold", "hold_timestamp": {"$lte": expiration_time}, "day": today},
+        {"$set": {"transaction": "Cut Off/Cancelled"}, "$unset": {"active": ""},
+         "$currentDate": {"updated_at": True}}
+    )
+    record_transition(db, collection_name, today, "On Hold", "Cut Off/Cancelled", result.modified_count)
+    if result.modified_count:
+        active_ids.invalidate(collection_name)
+        logging.info(f"System automatically canceled {result.modified_count} expired holds in {collection_name}.")
+
+
+def oldest_hold(collection_name, today):
+    """ hold_timestamp of the office's longest-held ticket today, or None. """
+    queue = db[collection_name].find_one(
+        {"transaction": "On Hold", "day": today, "hold_timestamp": {"$ne": None}},
+        {"_id": 0, "hold_timestamp": 1},
+        sort=[("hold_timestamp", 1)]
+    )
+    return queue["hold_timestamp"] if queue else None
+
+
+class QueueScheduler:
+    """
+    Runs the cut-off and hold-expiry actions for every office at the moment they fall due: it sleeps
+    until the earlier of the next cut-off and the earliest hold_timestamp + hold_expiry_minutes, then
+    issues one update_many per due office. The clock is injectable (see controllers.Shared.clock).
+    With a lease it only runs while this worker is the leader; without one it always runs.
+    """
+
+    def __init__(self, offices=OFFICES, clock=None, max_sleep=None, lease=None, stats=None):
+        self.offices = offices
+        self.clock = clock or SystemClock()
+        self.lease = lease
+        self.stats = stats
+        # Holds placed by other workers are only seen on a re-read; staying under the expiry keeps them exact
+        self.max_sleep = max_sleep or CONFIG["scheduler_max_sleep"]
+        self._wake = threading.Event()
+
+    def notify(self, office, day):
+        """ Change listener: after the cut-off, a new ticket has to be cancelled right away. """
+        local_now = self.clock.local_now()
+        if local_now >= cutoff_at(local_now):
+            self._wake.set()
+
+    def _run(self, job, office, *args):
+        started = time.perf_counter()
+        failed = False
+        try:
+            job(office["collection_name"], *args)
+        except Exception as e:
+            failed = True
+            logging.error(f"Error in {job.__name__} for {office['name']}: {e}")
+        if self.stats is not None:
+            self.stats.record(f"{job.__name__}/{office['name']}", (time.perf_counter() - started) * 1000, failed)
+
+    def run_due(self):
+        """ Runs every action that is due now and returns the time the next one falls due. """
+        # Hold timestamps are UTC; the cut-off and the day tickets are filed under are local
+        now = self.clock.now()
+        local_now = self.clock.local_now()
+        today = local_now.strftime("%Y-%m-%d")
+        expiry = timedelta(minutes=CONFIG["hold_expiry_minutes"])
+
+        next_cutoff = cutoff_at(local_now)
+        # Past the cut-off every pass re-runs it, catching tickets issued late on any worker
+        if local_now >= next_cutoff:
+            for office in self.offices:
+                self._run(auto_cutoff, office, local_now)
+            next_cutoff += timedelta(days=1)
+        # Due times are returned on the UTC clock the scheduler sleeps on
+        next_runs = [next_cutoff - (local_now - now), now + timedelta(seconds=self.max_sleep)]
+
+        for office in self.offices:
+            try:
+                held_since = oldest_hold(office["collection_name"], today)
+                if held_since and held_since + expiry <= now:
+                    self._run(cancel_expired_holds, office, now, today)
+                    held_since = oldest_hold(office["collection_name"], today)
+            except Exception as e:
+                logging.error(f"Error reading holds for {office['name']}: {e}")
+                held_since = None
+            if held_since:
+                next_runs.append(held_since + expiry)
+
+        return min(next_runs)
+
+    def run_forever(self):
+        while True:
+            if self.lease is not None and not self.lease.leading.wait(self.lease.heartbeat):
+                continue  # Passive: the leader runs the jobs
+            # Cleared before the pass so a notification arriving during it is not lost
+            self._wake.clear()
+            next_run = self.run_due()
+            # A due action that failed to clear would otherwise leave next_run in the past and spin
+            self.clock.wait(self._wake, max(1.0, (next_run - self.clock.now()).total_seconds()))
+
+
+job_stats = JobStats()
+# Every worker starts the scheduler; only the holder of this lease runs its actions
+scheduler_lease = LeaderLease(db, "office-scheduler", stats=job_stats)
+scheduler = QueueScheduler(lease=scheduler_lease, stats=job_stats)
+_scheduler_started = threading.Event()
+
+
+def start_background_tasks():
+    """ One scheduler thread per worker; the lease leaves the cut-off and hold-expiry actions to one of them. """
+    if _scheduler_started.is_set():
+        return
+    _scheduler_started.set()
+
+    add_change_listener(scheduler.notify)
+    scheduler_lease.start()
+    threading.Thread(target=scheduler.run_forever, name="office-scheduler", daemon=True).start()
+
+
+office_blueprints = {office["name"]: create_office_blueprint(office) for office in OFFICES}
+
+
+def register_office_blueprints(app):
+    for office in OFFICES:
+        app.register_blueprint(office_blueprints[office["name"]], url_prefix=office["url_prefix"])
+    start_background_tasks()
@@ -1,17 +1,16 @@
 from flask import Blueprint, render_template, session, redirect, url_for
-from pymongo import MongoClient
 import matplotlib.pyplot as plt
 import io, base64
 import pandas as pd
 from datetime import datetime, timedelta
 from statsmodels.tsa.arima.model import ARIMA
+from controllers.Shared.database import get_db
 
 # Create Blueprint for superadmin
 stats_bp = Blueprint("stats", __name__, url_prefix="/stats")
 
 # Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["QueueSystem"]
+db = get_db()
 queue_stats = db["CashierQueueStats"]
 
 
@@ -1,16 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from pymongo import MongoClient
 import hashlib
-import os
-from dotenv import load_dotenv
+from controllers.Shared.database import get_db
 from controllers.Superadmin.superadmin import superadmin_bp
 
-load_dotenv()
-
 # MongoDB setup
-mongo_uri = os.getenv('MONGO_URI')
-client = MongoClient(mongo_uri)
-db = client['QueueSystem']
+db = get_db()
 users_collection = db['users']
 
 # Create a sub-blueprint
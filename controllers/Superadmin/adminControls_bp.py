@@ -1,20 +1,19 @@
 from flask import Blueprint, jsonify, request, render_template, session
-from pymongo import MongoClient, errors
+from controllers.Shared.active_ids import active_ids
+from controllers.Shared.database import get_db, command_stats
+from controllers.Shared.logger import configure_logging
+from controllers.Shared.summary import ensure_summary, record_transition
+from controllers.Staff.office_engine import scheduler_lease
 from datetime import datetime
 import logging
 
 adminControls_bp = Blueprint('adminControls', __name__, url_prefix='settings')
 
-# Configure logging
-logging.basicConfig(
-    filename="logs/admin_console.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Logging Configuration: shared, non-blocking JSON pipeline; logger "admin" also goes to logs/admin_console.log
+configure_logging()
+logger = logging.getLogger("admin")
 
 CONFIG = {
-    "db_url": "mongodb://localhost:27017/",
-    "db_name": "QueueSystem",
     "queue_collections": [
         "CashierQueueRecords", "MarketingQueueRecords", "BusinessOfficeQueueRecords",
         "CSDLQueueRecords", "RegistrarQueueRecords"
@@ -23,36 +22,39 @@ CONFIG = {
 
 
 class AdminConsole:
-    def __init__(self):
-        try:
-            self.client = MongoClient(CONFIG["db_url"])
-            self.db = self.client[CONFIG["db_name"]]
-        except errors.ConnectionFailure as e:
-            logging.error(f"Failed to connect to MongoDB: {e}")
-            raise
+    def __init__(self, db=None):
+        self.db = db if db is not None else get_db()
 
     def view_cashier_transactions(self, office, cashier_username):
         today = datetime.now().strftime("%Y-%m-%d")
         collection = self.db[office]
         stats = {
             "holds": collection.count_documents(
-                {"transaction": "On Hold", "reserved_by": cashier_username, "date": {"$regex": f"^{today}"}}),
+                {"transaction": "On Hold", "reserved_by": cashier_username, "day": today}),
             "completed": collection.count_documents(
-                {"transaction": "Completed", "reserved_by": cashier_username, "date": {"$regex": f"^{today}"}}),
+                {"transaction": "Completed", "reserved_by": cashier_username, "day": today}),
             "cutoffs": collection.count_documents(
-                {"transaction": "Cut Off/Cancelled", "reserved_by": cashier_username, "date": {"$regex": f"^{today}"}}),
+                {"transaction": "Cut Off/Cancelled", "reserved_by": cashier_username, "day": today}),
         }
-        logging.info(f"Viewed transactions for cashier '{cashier_username}' in office '{office}': {stats}")
+        logger.info(f"Viewed transactions for cashier '{cashier_username}' in office '{office}': {stats}")
         return stats
 
+    def _cancel_on_queue(self, office, query):
+        """ Cuts off the matching On Queue tickets and moves the daily summary counters with them. """
+        today = query["day"]
+        ensure_summary(self.db, office, today)
+        result = self.db[office].update_many(query, {"$set": {"transaction": "Cut Off/Cancelled"},
+                                                     "$unset": {"active": ""},
+                                                     "$currentDate": {"updated_at": True}})
+        record_transition(self.db, office, today, "On Queue", "Cut Off/Cancelled", result.modified_count)
+        return result
+
     def cancel_queues(self, office):
         today = datetime.now().strftime("%Y-%m-%d")
-        collection = self.db[office]
-        result = collection.update_many(
-            {"transaction": "On Queue", "date": {"$regex": f"^{today}"}},
-            {"$set": {"transaction": "Cut Off/Cancelled"}}
-        )
-        logging.info(f"Cancelled all queues in office '{office}': {result.modified_count} queues updated.")
+        result = self._cancel_on_queue(office, {"transaction": "On Queue", "day": today})
+        if result.modified_count:
+            active_ids.invalidate(office)
+        logger.info(f"Cancelled all queues in office '{office}': {result.modified_count} queues updated.")
         return result.modified_count
 
     def set_priority_section(self, office, section):
@@ -61,21 +63,20 @@ class AdminConsole:
         today = datetime.now().strftime("%Y-%m-%d")
         collection = self.db[office]
         result = collection.update_many(
-            {"transaction": "On Queue", "section": section, "date": {"$regex": f"^{today}"}},
-            {"$set": {"priority": True}}
+            {"transaction": "On Queue", "section": section, "day": today},
+            {"$set": {"priority": True}, "$currentDate": {"updated_at": True}}
         )
-        logging.info(f"Prioritized section '{section}' in office '{office}': {result.modified_count} queues updated.")
+        logger.info(f"Prioritized section '{section}' in office '{office}': {result.modified_count} queues updated.")
         return result.modified_count
 
     def cancel_section_queues(self, office, section):
         if section not in ["MAIN", "SOUTH"]:
             return {"error": "Invalid section. Choose either 'MAIN' or 'SOUTH'."}
-        collection = self.db[office]
-        result = collection.update_many(
-            {"transaction": "On Queue", "section": section},
-            {"$set": {"transaction": "Cut Off/Cancelled"}}
-        )
-        logging.info(
+        today = datetime.now().strftime("%Y-%m-%d")
+        result = self._cancel_on_queue(office, {"transaction": "On Queue", "section": section, "day": today})
+        if result.modified_count:
+            active_ids.invalidate(office)
+        logger.info(
             f"Cancelled queues from section '{section}' in office '{office}': {result.modified_count} queues updated.")
         return result.modified_count
 
@@ -107,13 +108,13 @@ def cancel_queues():
 @adminControls_bp.route('/set_priority_section', methods=['POST'])
 def set_priority_section():
     data = request.json
-    logging.info(f"Received data for set_priority_section: {data}")
+    logger.info(f"Received data for set_priority_section: {data}")
 
     office = data.get("office")
     section = data.get("section")
 
     if not office or not section:
-        logging.error("Missing office or section in request payload.")
+        logger.error("Missing office or section in request payload.")
         return jsonify({"error": "Both office and section fields are required."}), 400
 
     if office not in CONFIG["queue_collections"]:
@@ -145,6 +146,22 @@ def cancel_section_queues():
     return jsonify({"message": f"{result} queues from section '{section}' have been cancelled."})
 
 
+@adminControls_bp.route('/db_stats', methods=['GET'])
+def db_stats():
+    """ Operation counts and latencies per collection, from the shared connection's command listener. """
+    if 'username' not in session or session['role'] != 'superadmin':
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(command_stats.snapshot())
+
+
+@adminControls_bp.route('/scheduler_status', methods=['GET'])
+def scheduler_status():
+    """ Which worker leads the background jobs, and how long each job took on the leader. """
+    if 'username' not in session or session['role'] != 'superadmin':
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(scheduler_lease.status())
+
+
 @adminControls_bp.route('/')
 def settings_dashboard():
     if 'username' not in session or session['role'] != 'superadmin':
@@ -1,13 +1,11 @@
 from flask import Blueprint, render_template, request, jsonify
-from pymongo import MongoClient
 import hashlib
+from controllers.Shared.database import get_db
 
 users_bp = Blueprint('users', __name__, url_prefix='/users')
 
 # Database connection
-mongo_uri = 'mongodb://localhost:27017/'
-client = MongoClient(mongo_uri)
-db = client['QueueSystem']
+db = get_db()
 users_collection = db['users']
 
 def hash_password(password):
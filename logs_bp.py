@@ -1,21 +1,104 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, Response, redirect, render_template, jsonify, request, session, stream_with_context, url_for
 import os
+import queue
+from controllers.Shared.events import sse_message
+from controllers.Shared.log_reader import format_record, make_cursor, matches, read_page
+from controllers.Shared.log_tail import GAP, LogTailer
+from controllers.Shared.logger import LOG_CONFIG
 
 logs_bp = Blueprint('logs', __name__)
 
-LOG_FILE_PATH = "./logs/queue_system.log"  # ✅ Change if needed
+LOG_FILE_PATH = LOG_CONFIG["path"]  # The file the logging pipeline writes (LOG_PATH)
+PAGE_SIZE = 50  # Log entries per page
+MAX_PAGE_SIZE = 500
+STREAM_HEARTBEAT = 15  # Seconds between keep-alives on a quiet log stream
+
+# One follower of the log file shared by every open stream
+log_tailer = LogTailer(LOG_FILE_PATH)
+
+
+def page_args():
+    """ Cursor, page size and filters from the query string. """
+    return {
+        "cursor": request.args.get("cursor") or None,
+        "limit": min(request.args.get("limit", PAGE_SIZE, type=int), MAX_PAGE_SIZE),
+        "level": request.args.get("level") or None,
+        "office": request.args.get("office") or None,
+        "user": request.args.get("user") or None
+    }
+
 
 @logs_bp.route('/', methods=['GET'])
 def view_logs():
-    """Reads and returns log contents."""
+    """Renders the newest page of log entries, seeking from the end of the file."""
+    if 'username' not in session or session['role'] != 'superadmin':
+        return redirect(url_for('login'))
+
+    args = page_args()
+    filters = {key: args[key] for key in ("level", "office", "user")}
     try:
         if not os.path.exists(LOG_FILE_PATH):
-            return render_template('superadmin/logs.html', logs=[])  # ✅ Return empty logs initially
+            return render_template('superadmin/logs.html', logs=[], filters=filters)  # ✅ Return empty logs initially
+
+        # Taken before the page is read, so the live stream starting here repeats rather than skips lines
+        live_cursor = make_cursor(LOG_FILE_PATH, os.path.getsize(LOG_FILE_PATH))
+        records, next_cursor = read_page(LOG_FILE_PATH, **args)
+        logs = [format_record(record) for record in records]
+        return render_template('superadmin/logs.html', logs=logs, next_cursor=next_cursor, live_cursor=live_cursor,
+                               filters=filters)
+
+    except Exception as e:
+        return render_template('superadmin/logs.html', logs=[f"Error loading logs: {str(e)}"], filters=filters)
 
-        with open(LOG_FILE_PATH, "r") as file:
-            logs = file.readlines()[-50:]  # ✅ Return the last 50 log entries
 
-        return render_template('superadmin/logs.html', logs=logs)
+@logs_bp.route('/page', methods=['GET'])
+def logs_page():
+    """Returns one page of entries older than the cursor, plus the cursor for the page before it."""
+    if 'username' not in session or session['role'] != 'superadmin':
+        return jsonify({"error": "Unauthorized"}), 403
 
+    try:
+        records, next_cursor = read_page(LOG_FILE_PATH, **page_args())
     except Exception as e:
-        return render_template('superadmin/logs.html', logs=[f"Error loading logs: {str(e)}"])
+        return jsonify({"error": f"Error loading logs: {str(e)}"}), 500
+    return jsonify({"logs": [format_record(record) for record in records], "next_cursor": next_cursor})
+
+
+@logs_bp.route('/stream', methods=['GET'])
+def stream_logs():
+    """
+    Follows the log like tail -f as server-sent events. Each event's id is its byte cursor, so a
+    reconnecting browser resumes from Last-Event-ID; ?cursor= does the same for the first connection.
+    """
+    if 'username' not in session or session['role'] != 'superadmin':
+        return jsonify({"error": "Unauthorized"}), 403
+
+    filters = {key: request.args.get(key) or None for key in ("level", "office", "user")}
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor") or None
+    subscription, backlog, gap = log_tailer.subscribe(cursor)
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if gap:
+                yield sse_message("gap", {"message": "Some log lines were skipped."})
+            for entry_cursor, record, _, _ in backlog:
+                if matches(record, **filters):
+                    yield sse_message("log", {"line": format_record(record)}, entry_cursor)
+            while True:
+                try:
+                    entry = subscription.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if entry is GAP:
+                    yield sse_message("gap", {"message": "Some log lines were skipped."})
+                    continue
+                entry_cursor, record, _, _ = entry
+                if matches(record, **filters):
+                    yield sse_message("log", {"line": format_record(record)}, entry_cursor)
+        finally:
+            log_tailer.unsubscribe(subscription)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,104 @@
+"""
+Maintenance commands for the queue database.
+
+    python manage.py backfill-day      Add day/created_at to records written before those fields existed
+    python manage.py backfill-seq      Add the integer seq used for queue ordering to older records
+    python manage.py reconcile-summary Rebuild today's daily summary counters from raw records and report drift
+                                       (--day YYYY-MM-DD, --fix to overwrite the stored counters)
+    python manage.py ensure-indexes    Create the indexes declared in controllers/Shared/indexes.py
+    python manage.py audit-queries     Explain every registered hot query; fail if any falls back to COLLSCAN
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from controllers.Shared.database import get_db
+from controllers.Shared.indexes import QUEUE_COLLECTIONS, audit_queries, ensure_indexes
+from controllers.Shared.summary import reconcile_summary
+
+
+def queue_record_collections(db):
+    return sorted(name for name in db.list_collection_names() if name.endswith("QueueRecords"))
+
+
+def backfill_day(db):
+    for name in queue_record_collections(db):
+        result = db[name].update_many(
+            {"day": {"$exists": False}, "date": {"$type": "string"}},
+            [{"$set": {
+                "day": {"$substrBytes": ["$date", 0, 10]},
+                "created_at": {"$dateFromString": {
+                    "dateString": "$date", "format": "%Y-%m-%d %H:%M:%S", "onError": None
+                }}
+            }}]
+        )
+        print(f"{name}: backfilled {result.modified_count} records")
+    ensure_indexes(db)
+    return 0
+
+
+def backfill_seq(db):
+    for name in queue_record_collections(db):
+        # "S-0012-SOUTH" -> 12
+        result = db[name].update_many(
+            {"seq": {"$exists": False}, "queueNumber": {"$type": "string"}},
+            [{"$set": {"seq": {"$convert": {
+                "input": {"$arrayElemAt": [{"$split": ["$queueNumber", "-"]}, 1]},
+                "to": "int", "onError": None
+            }}}}]
+        )
+        print(f"{name}: backfilled {result.modified_count} records")
+    ensure_indexes(db)
+    return 0
+
+
+def reconcile(db, day=None, fix=False):
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    drift = 0
+    for name in QUEUE_COLLECTIONS:
+        diffs = reconcile_summary(db, name, day, fix=fix)
+        drift += bool(diffs)
+        details = ", ".join(f"{field} stored {stored} actual {actual}" for field, (stored, actual) in diffs.items())
+        print(f"{'DRIFT' if diffs else 'OK   '} {name:<28} {details}{' (fixed)' if diffs and fix else ''}")
+    return 1 if drift and not fix else 0
+
+
+def create_indexes(db):
+    if not ensure_indexes(db):
+        print("Index provisioning failed, see the log")
+        return 1
+    print("Indexes are up to date")
+    return 0
+
+
+def audit(db):
+    failures = 0
+    for name, label, stages, ok in audit_queries(db):
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<35} {label:<14} {' <- '.join(stages)}")
+    print(f"{failures} hot queries without an index" if failures else "All hot queries use an index")
+    return 1 if failures else 0
+
+
+COMMANDS = {
+    "backfill-day": backfill_day,
+    "backfill-seq": backfill_seq,
+    "reconcile-summary": reconcile,
+    "ensure-indexes": create_indexes,
+    "audit-queries": audit,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue database maintenance.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--day", help="YYYY-MM-DD for reconcile-summary (default today)")
+    parser.add_argument("--fix", action="store_true", help="reconcile-summary: overwrite drifted counters")
+    args = parser.parse_args()
+    if args.command == "reconcile-summary":
+        sys.exit(reconcile(get_db(), args.day, args.fix))
+    sys.exit(COMMANDS[args.command](get_db()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+// Staff console status: pushed by /<office>_api/events, with polling only where EventSource is missing.
+
+function applyQueueStatus(data) {
+    // Events carry only the counts that changed; keep the rest as they are. Not every console shows
+    // every count (registrar, csdl and marketing have no on-hold count), so skip what is not on the page.
+    ["on_queue_count", "on_hold_count", "cut_off_count"].forEach((field) => {
+        const element = document.getElementById(field);
+        if (field in data && element) {
+            element.textContent = data[field];
+        }
+    });
+
+    let inProcessMessage = document.getElementById("in_process_message");
+    if ("in_process_queue" in data && inProcessMessage) {
+        if (data.in_process_queue) {
+            inProcessMessage.innerHTML = `<strong>In Process:</strong> ${data.in_process_queue}`;
+        } else {
+            inProcessMessage.textContent = "In Process: No queue is currently in process.";
+        }
+    }
+}
+
+function subscribeQueueEvents(url, pollStatus) {
+    if (!window.EventSource) {
+        pollStatus();
+        return setInterval(pollStatus, 5000); // Refresh every 5 seconds
+    }
+
+    // The browser reconnects on its own and the server resends the full status when it does
+    const source = new EventSource(url, { withCredentials: true });
+    source.addEventListener("status", (event) => applyQueueStatus(JSON.parse(event.data)));
+    source.onerror = () => console.warn("Queue events disconnected, reconnecting...");
+    return source;
+}
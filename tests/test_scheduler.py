@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from controllers.Shared.clock import ManualClock
+from controllers.Staff import office_engine
+from controllers.Staff.office_engine import QueueScheduler
+
+OFFICE = {"name": "cashier", "collection_name": "CashierQueueRecords", "url_prefix": "/cashier_api"}
+
+
+class QueueSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        # 23:30 UTC on Jan 1 is 07:30 local on Jan 2 in UTC+8, well before the 17:00 local cut-off
+        self.clock = ManualClock(datetime(2025, 1, 1, 23, 30), utc_offset=timedelta(hours=8))
+        self.scheduler = QueueScheduler(offices=[OFFICE], clock=self.clock, max_sleep=600)
+        self.holds = {}  # day -> oldest hold_timestamp
+
+        patches = [
+            mock.patch.object(office_engine, "oldest_hold", side_effect=lambda name, day: self.holds.get(day)),
+            mock.patch.object(office_engine, "cancel_expired_holds", side_effect=self._expire),
+            mock.patch.object(office_engine, "auto_cutoff"),
+        ]
+        self.oldest_hold, self.cancel_expired_holds, self.auto_cutoff = [p.start() for p in patches]
+        for p in patches:
+            self.addCleanup(p.stop)
+
+    def _expire(self, collection_name, now, today):
+        self.holds.pop(today, None)
+
+    def test_no_holds_sleeps_until_max_sleep(self):
+        next_run = self.scheduler.run_due()
+
+        self.assertEqual(next_run, self.clock.now() + timedelta(seconds=600))
+        self.cancel_expired_holds.assert_not_called()
+
+    def test_no_cutoff_in_the_local_morning(self):
+        # 17:00 UTC has passed, but it is 07:30 local: the morning's tickets must not be cancelled
+        self.scheduler.run_due()
+        self.scheduler.notify(OFFICE["collection_name"], "2025-01-02")
+
+        self.auto_cutoff.assert_not_called()
+        self.assertFalse(self.scheduler._wake.is_set())
+
+    def test_hold_expires_at_its_deadline_on_the_local_day(self):
+        held_at = self.clock.now() - timedelta(minutes=20)
+        self.holds["2025-01-02"] = held_at
+
+        # Ten minutes before expiry: nothing runs and the scheduler wakes at the deadline
+        self.assertEqual(self.scheduler.run_due(), held_at + timedelta(minutes=30))
+        self.oldest_hold.assert_called_with(OFFICE["collection_name"], "2025-01-02")
+        self.cancel_expired_holds.assert_not_called()
+
+        self.clock.advance(10 * 60)
+        self.scheduler.run_due()
+
+        self.cancel_expired_holds.assert_called_once_with(OFFICE["collection_name"], self.clock.now(), "2025-01-02")
+        self.assertNotIn("2025-01-02", self.holds)
+
+    def test_cutoff_runs_at_the_local_cutoff(self):
+        # 08:59 UTC is 16:59 local; the scheduler wakes at 09:00 UTC
+        self.clock.advance(9 * 3600 + 29 * 60)
+        self.assertEqual(self.scheduler.run_due(), datetime(2025, 1, 2, 9, 0))
+        self.auto_cutoff.assert_not_called()
+
+        self.clock.advance(60)
+        self.scheduler.run_due()
+
+        self.auto_cutoff.assert_called_once_with(OFFICE["collection_name"], datetime(2025, 1, 2, 17, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,22 @@
-from flask import Blueprint, render_template
-from pymongo import MongoClient
+from flask import Blueprint, Response, jsonify, make_response, render_template, request, stream_with_context
 from datetime import datetime
-import logging
+import hashlib
+import queue
+import json
+from controllers.Shared.cache import SingleFlightCache
+from controllers.Shared.database import get_db
+from controllers.Shared.events import queue_events, sse_message
+from controllers.Shared.indexes import QUEUE_ORDER
+from controllers.Shared.logger import configure_logging
 
-# Initialize logging
-logging.basicConfig(
-    filename="logs/queue_system.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Logging Configuration: shared, non-blocking JSON pipeline
+configure_logging()
 
 # Flask Blueprint
 viewQueue_bp = Blueprint('viewQueue', __name__, template_folder='templates')
 
-# MongoDB client setup (modify with actual URI)
-client = MongoClient("mongodb://localhost:27017/")
-db = client["QueueSystem"]
+# Shared MongoDB connection
+db = get_db()
 
 # Configuration
 CONFIG = {
@@ -25,9 +26,60 @@ CONFIG = {
         "business_office": "BusinessOfficeQueueRecords",
         "csdl": "CSDLQueueRecords",
         "registrar": "RegistrarQueueRecords"
-    }
+    },
+    "display_limit": 21,  # On Queue tickets a lobby display has room for
+    "snapshot_ttl": 1.0,  # Seconds one department snapshot is shared by every display and kiosk
+    "events_heartbeat": 15,  # Seconds between keep-alives; the lists are re-checked on each one
+    "events_retry_ms": 3000
 }
 
+
+def queue_snapshot(collection_name, today):
+    """ Queue numbers a lobby display shows: everything In Process and the head of On Queue. """
+    collection = db[collection_name]
+    snapshot = {}
+
+    for state, limit in [("In Process", 0), ("On Queue", CONFIG["display_limit"])]:
+        queues = collection.find(
+            {"transaction": state, "day": today},
+            {"_id": 0, "queueNumber": 1}
+        ).sort(QUEUE_ORDER).limit(limit)
+        snapshot[state] = [queue_doc["queueNumber"] for queue_doc in queues]
+
+    return snapshot
+
+
+snapshot_cache = SingleFlightCache(CONFIG["snapshot_ttl"])
+page_cache = {}  # department -> (etag, rendered page)
+
+
+def load_snapshot(collection_name, today):
+    lists = queue_snapshot(collection_name, today)
+    body = json.dumps(lists)
+    return {"lists": lists, "json": body, "etag": hashlib.sha1(body.encode()).hexdigest()}
+
+
+def cached_snapshot(collection_name, today):
+    """
+    Department snapshot read at most once per snapshot_ttl however many screens ask; concurrent callers
+    wait for the one in-flight read. A change seen by the event hub forces the next read.
+    """
+    return snapshot_cache.get(
+        (collection_name, today),
+        lambda: load_snapshot(collection_name, today),
+        fresh_after=queue_events.changed_at(collection_name, today)
+    )
+
+
+def conditional_response(body, etag, mimetype):
+    """ 304 Not Modified when the client already holds this etag. """
+    response = make_response(body)
+    response.mimetype = mimetype
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"  # Revalidate every time; the etag keeps it cheap
+    return response.make_conditional(request)
+
+
 # Route for each department queue
 @viewQueue_bp.route('/queue/<department>')
 def display_department_queue(department):
@@ -35,24 +87,71 @@ def display_department_queue(department):
     Display 'In Process' and 'On Queue' states for a specific department.
     """
     today = datetime.now().strftime("%Y-%m-%d")
-    states = ["In Process", "On Queue"]
 
     collection_name = CONFIG["queue_collections"].get(department)
     if not collection_name:
         return f"<h2>Error</h2><p>Department '{department}' not found.</p>", 404
 
-    collection = db[collection_name]
-    department_queues = {}
-
-    for state in states:
-        queues = list(collection.find(
-            {"transaction": state, "date": {"$regex": f"^{today}"}}
-        ).sort([
-            ("priority", -1),
-            ("queueNumber", 1)
-        ]))
-        department_queues[state] = queues
-
-    return render_template("department_queue.html",
-                           department_name=department.capitalize(),
-                           queues=department_queues)
\ No newline at end of file
+    snapshot = cached_snapshot(collection_name, today)
+    etag = f"{snapshot['etag']}-html"
+
+    cached_page = page_cache.get(department)
+    if cached_page is None or cached_page[0] != etag:
+        cached_page = (etag, render_template("department_queue.html",
+                                             department=department,
+                                             department_name=department.capitalize(),
+                                             queues=snapshot["lists"]))
+        page_cache[department] = cached_page
+
+    return conditional_response(cached_page[1], etag, "text/html")
+
+
+@viewQueue_bp.route('/queue/<department>/snapshot')
+def department_queue_snapshot(department):
+    """
+    JSON form of the lobby display lists.
+    """
+    collection_name = CONFIG["queue_collections"].get(department)
+    if not collection_name:
+        return jsonify({"error": f"Department '{department}' not found."}), 404
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    snapshot = cached_snapshot(collection_name, today)
+    return conditional_response(snapshot["json"], snapshot["etag"], "application/json")
+
+
+@viewQueue_bp.route('/queue/<department>/events')
+def department_queue_events(department):
+    """
+    Server-sent events: the lists once, then again only when they change. The lists are re-read when the
+    department's daily counts move, plus once per heartbeat to catch reordering such as a section promotion.
+    """
+    collection_name = CONFIG["queue_collections"].get(department)
+    if not collection_name:
+        return jsonify({"error": f"Department '{department}' not found."}), 404
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    subscription = queue_events.subscribe(collection_name, today)
+
+    def stream():
+        try:
+            yield f"retry: {CONFIG['events_retry_ms']}\n\n"
+            snapshot = cached_snapshot(collection_name, today)
+            last_etag = snapshot["etag"]
+            yield sse_message("queue", snapshot["lists"])
+            while True:
+                try:
+                    subscription.get(timeout=CONFIG["events_heartbeat"])
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+
+                # Every stream of the department wakes together and shares one read
+                snapshot = cached_snapshot(collection_name, today)
+                if snapshot["etag"] != last_etag:
+                    last_etag = snapshot["etag"]
+                    yield sse_message("queue", snapshot["lists"])
+        finally:
+            queue_events.unsubscribe(collection_name, today, subscription)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})